@@ -0,0 +1,34 @@
+import argparse
+from src import analytics, config
+
+def main():
+    """Exports finished games to columnar files, or prints the common analyses of an export."""
+    parser = argparse.ArgumentParser(description="Columnar export and offline analysis of finished games.")
+    parser.add_argument("command", choices=("export", "report"))
+    parser.add_argument("--db", default=config.DB_FILE, help="SQLite database to export.")
+    parser.add_argument("--dir", default=config.ANALYTICS_DIR, help="Directory of the columnar export.")
+    parser.add_argument("--by", choices=("model", "player"), default="model", help="Grouping of the report.")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        counts = analytics.export(args.dir, db_file=args.db)
+        print(f"Exported {counts['games']} games, {counts['moves']} moves and {counts['boards']} boards to {args.dir}/.")
+        return
+
+    data = analytics.load(args.dir)
+    for title, distributions in (
+        ("Shots to sink a ship", analytics.turn_to_sink(data, by=args.by)),
+        ("Shots to first hit", analytics.first_hit_latency(data, by=args.by)),
+    ):
+        print(f"\n--- {title} ---")
+        for label, summary in analytics.summarize(distributions).items():
+            print(f"  {label}: n={summary['count']}, mean {summary['mean']:.1f}, p50 {summary['p50']:.0f}, "
+                  f"p90 {summary['p90']:.0f}, max {summary['max']}")
+    print("\n--- Shot heatmap (all players) ---")
+    heatmap = analytics.shot_heatmap(data)
+    share = heatmap / max(heatmap.sum(), 1) * 100
+    for row in share:
+        print("  " + " ".join(f"{value:4.1f}" for value in row))
+
+if __name__ == "__main__":
+    main()
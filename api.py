@@ -1,11 +1,39 @@
 import sqlite3
 import json
-from flask import Flask, jsonify, send_from_directory, request
+import io
+import csv
+import zlib
+import gzip
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from flask import Flask, Response, jsonify, send_from_directory, request, stream_with_context
 from flask_cors import CORS
+from src import replay, stats
 
 app = Flask(__name__)
 CORS(app) # This will enable CORS for all routes
 DB_FILE = "battleship.db"
+STREAM_POLL_INTERVAL = 0.5 # Seconds between checks for new turns in a live stream
+STREAM_KEEPALIVE_INTERVAL = 15 # Seconds between keep-alive comments on an idle stream
+FINISHED_GAME_CACHE_MAX_BYTES = 64 * 1024 * 1024 # Memory bound for cached finished-game responses
+FINISHED_GAME_MAX_AGE = 24 * 3600 # Seconds browsers may reuse a finished game without revalidating
+COMPRESS_MIN_BYTES = 1024 # JSON responses smaller than this are sent uncompressed
+RAW_EXPORT_CHUNK_ROWS = 1000 # Rows fetched from the cursor per chunk of a raw export
+RAW_EXPORT_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'columnar': 'application/x-ndjson',
+}
+# Column used by the ?since= / ?until= filters of each raw table.
+RAW_EXPORT_TIME_FILTERS = {
+    'games': "start_time {op} ?",
+    'moves': "timestamp {op} ?",
+    'boards': "game_id IN (SELECT game_id FROM games WHERE start_time {op} ?)",
+}
 
 def query_db(query, args=(), one=False):
     """Helper function to query the database and return results."""
@@ -17,6 +45,64 @@ def query_db(query, args=(), one=False):
     conn.close()
     return (rv[0] if rv else None) if one else rv
 
+class _FinishedGameCache:
+    """
+    Size-bounded LRU of serialized responses for finished games. A game's data never
+    changes once it has a winner, so entries never need invalidating.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, game_id):
+        with self.lock:
+            entry = self.entries.get(game_id)
+            if entry is not None:
+                self.entries.move_to_end(game_id)
+            return entry
+
+    def put(self, game_id, entry):
+        entry_size = len(entry['body']) + len(entry['gzip_body'])
+        with self.lock:
+            if game_id in self.entries or entry_size > self.max_bytes:
+                return
+            self.entries[game_id] = entry
+            self.size += entry_size
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted['body']) + len(evicted['gzip_body'])
+
+_finished_games = _FinishedGameCache(FINISHED_GAME_CACHE_MAX_BYTES)
+
+def _parse_db_timestamp(value):
+    """Converts a SQLite CURRENT_TIMESTAMP string (UTC) to an aware datetime."""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+def _accepts_gzip():
+    return 'gzip' in request.accept_encodings
+
+@app.after_request
+def compress_response(response):
+    """Gzips JSON responses when the client accepts it."""
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or 'Content-Encoding' in response.headers or response.mimetype != 'application/json'
+            or not _accepts_gzip()):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
 @app.route('/')
 def index():
     """Serves the main HTML visualizer page."""
@@ -24,39 +110,116 @@ def index():
 
 @app.route('/api/summary')
 def get_summary():
-    """Provides a dynamic summary of win counts for all players."""
-    # Get all distinct winners from the database
-    winners_query = query_db("SELECT DISTINCT winner FROM games WHERE winner IS NOT NULL")
-    player_names = [row['winner'] for row in winners_query]
-    
-    # Get all games to count wins
-    all_games = query_db("SELECT winner FROM games WHERE winner IS NOT NULL")
-    
-    win_counts = {name: 0 for name in player_names}
-    for game in all_games:
-        if game['winner'] in win_counts:
-            win_counts[game['winner']] += 1
-            
-    total_games = len(all_games)
+    """
+    Provides a dynamic summary of win counts for all players. Games played with the
+    response cache are left out unless ?include_cached=1 is given.
+    """
+    cache_filter = "" if request.args.get('include_cached') == '1' else " AND NOT response_cache"
+    rows = query_db(f"SELECT winner, COUNT(*) AS wins FROM games WHERE winner IS NOT NULL{cache_filter} GROUP BY winner")
+    win_counts = {row['winner']: row['wins'] for row in rows}
     
     return jsonify({
-        "total_games": total_games,
+        "total_games": sum(win_counts.values()),
         "win_counts": win_counts
     })
 
+GAMES_PAGE_SIZE = 100
+GAMES_MAX_PAGE_SIZE = 1000
+
 @app.route('/api/games')
 def get_games():
-    """Returns a list of all completed games with player names."""
-    games = query_db("SELECT game_id, winner, turns, player1_name, player2_name FROM games WHERE winner IS NOT NULL ORDER BY game_id DESC")
-    return jsonify([dict(ix) for ix in games])
+    """
+    Returns a page of completed games, newest first. Supports keyset pagination with
+    ?before=<game_id> (pass the previous page's next_before) and ?limit=, plus filters
+    ?player=, ?winner=, ?since= and ?until= (compared with the game's start_time).
+    """
+    try:
+        limit = max(1, min(int(request.args.get('limit', GAMES_PAGE_SIZE)), GAMES_MAX_PAGE_SIZE))
+        before = request.args.get('before', type=int)
+    except ValueError:
+        return jsonify({"error": "limit and before must be integers"}), 400
+
+    conditions = ["winner IS NOT NULL"]
+    args = []
+    if before is not None:
+        conditions.append("game_id < ?")
+        args.append(before)
+    if request.args.get('player'):
+        conditions.append("(player1_name = ? OR player2_name = ?)")
+        args += [request.args['player'], request.args['player']]
+    if request.args.get('winner'):
+        conditions.append("winner = ?")
+        args.append(request.args['winner'])
+    if request.args.get('since'):
+        conditions.append("start_time >= ?")
+        args.append(request.args['since'])
+    if request.args.get('until'):
+        conditions.append("start_time < ?")
+        args.append(request.args['until'])
+
+    # Fetch one extra row to know whether another page exists.
+    games = query_db(
+        "SELECT game_id, winner, turns, player1_name, player2_name, response_cache FROM games "
+        f"WHERE {' AND '.join(conditions)} ORDER BY game_id DESC LIMIT ?",
+        args + [limit + 1]
+    )
+    page = [dict(ix) for ix in games[:limit]]
+    return jsonify({
+        "games": page,
+        "next_before": page[-1]['game_id'] if len(games) > limit else None
+    })
 
 @app.route('/api/game/<int:game_id>')
 def get_game_details(game_id):
-    """Returns the detailed history for a specific game."""
+    """
+    Returns the detailed history for a specific game. Responses for finished games are
+    served from an in-memory cache with ETag/Last-Modified validation and gzip.
+    """
+    game_info = query_db("SELECT * FROM games WHERE game_id = ?", [game_id], one=True)
+    if game_info is None or not game_info['winner']:
+        details = _build_game_details(game_id, game_info)
+        if details is None:
+            return jsonify({"error": "Game not found"}), 404
+        response = jsonify(details)
+        response.cache_control.no_cache = True
+        return response
+
+    entry = _finished_games.get(game_id)
+    if entry is None:
+        details = _build_game_details(game_id, game_info)
+        if details is None:
+            return jsonify({"error": "Game not found"}), 404
+        body = app.json.dumps(details).encode('utf-8')
+        entry = {
+            'body': body,
+            'gzip_body': gzip.compress(body, compresslevel=9),
+            'etag': hashlib.sha1(body).hexdigest(),
+            'last_modified': _parse_db_timestamp(game_info['end_time']),
+        }
+        _finished_games.put(game_id, entry)
+
+    use_gzip = _accepts_gzip()
+    response = Response(entry['gzip_body'] if use_gzip else entry['body'], mimetype='application/json')
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    # Weak, because the same ETag covers both the gzipped and the plain representation.
+    response.set_etag(entry['etag'], weak=True)
+    if entry['last_modified']:
+        response.last_modified = entry['last_modified']
+    response.cache_control.public = True
+    response.cache_control.max_age = FINISHED_GAME_MAX_AGE
+    return response.make_conditional(request)
+
+def _build_game_details(game_id, game_info):
+    """
+    Builds the detailed history of a game, or returns None if the game does not exist. A game
+    whose first turns are still buffered by the database writer has an empty history.
+    """
+    if game_info is None:
+        return None
     # Get all moves for the game
     moves = query_db("SELECT * FROM moves WHERE game_id = ? ORDER BY turn ASC", [game_id])
-    if not moves:
-        return jsonify({"error": "Game not found or has no moves"}), 404
         
     # Get the initial board placements
     boards = query_db("SELECT player_name, ship_placements FROM boards WHERE game_id = ?", [game_id])
@@ -64,32 +227,31 @@ def get_game_details(game_id):
     final_boards = {}
     for board in boards:
         final_boards[board['player_name']] = json.loads(board['ship_placements'])
+    grid_size = len(next(iter(final_boards.values()))) if final_boards else 10
 
-    # Structure the history
+    # Structure the history. Only shots are stored, so the board snapshots are replayed here.
     history = []
-    for move in moves:
+    for move, boards_after in zip(moves, replay.board_views(moves, game_info['player1_name'], grid_size)):
         history.append({
             "turn": move['turn'],
             "player": move['player_name'],
             "shot": (move['shot_row'], move['shot_col']),
             "result": move['result'],
-            "boards": {
-                "LLM_1": json.loads(move['board_state_llm1']),
-                "LLM_2": json.loads(move['board_state_llm2'])
-            }
+            "boards": boards_after
         })
-        
-    game_info = query_db("SELECT * FROM games WHERE game_id = ?", [game_id], one=True)
 
-    return jsonify({
+    return {
         "game_id": game_id,
         "winner": game_info['winner'],
         "turns": game_info['turns'],
         "player1_name": game_info['player1_name'],
         "player2_name": game_info['player2_name'],
+        "settings": json.loads(game_info['settings']) if game_info['settings'] else None,
+        "response_cache": bool(game_info['response_cache']),
+        "seed": game_info['seed'],
         "history": history,
         "final_boards": final_boards
-    })
+    }
 
 @app.route('/api/game/latest')
 def get_latest_game():
@@ -100,17 +262,244 @@ def get_latest_game():
     latest_game = query_db("SELECT game_id FROM games ORDER BY game_id DESC LIMIT 1", one=True)
     if not latest_game:
         return jsonify({"error": "No games found"}), 404
-    return get_game_details(latest_game['game_id'])
+    response = get_game_details(latest_game['game_id'])
+    if isinstance(response, Response):
+        # The latest game changes, so this URL must always be revalidated.
+        response.cache_control.public = False
+        response.cache_control.max_age = None
+        response.cache_control.no_cache = True
+    return response
+
+@app.route('/api/game/latest/id')
+def get_latest_game_id():
+    """Returns only the id of the most recent game, so clients can cheaply detect a new game."""
+    latest_game = query_db("SELECT game_id, winner FROM games ORDER BY game_id DESC LIMIT 1", one=True)
+    if not latest_game:
+        return jsonify({"error": "No games found"}), 404
+    return jsonify(dict(latest_game))
+
+@app.route('/api/game/<int:game_id>/stream')
+def stream_game(game_id):
+    """
+    Server-sent events for a game: one 'turn' event per new move (shot and result only,
+    with the turn number as the event id), then an 'end' event once the game has a winner.
+    For a game that does not exist, the 'end' event carries an error instead, so the client
+    closes the stream rather than reconnecting. Turns appear once the game's process has
+    written them, i.e. up to DB_FLUSH_INTERVAL seconds after they are played.
+    Resume with ?from_turn=N or the Last-Event-ID header that EventSource sends on reconnect.
+    """
+    try:
+        last_turn = int(request.headers.get('Last-Event-ID') or request.args.get('from_turn', 0))
+    except ValueError:
+        return jsonify({"error": "from_turn must be an integer"}), 400
+
+    def events(last_turn):
+        conn = sqlite3.connect(DB_FILE)
+        conn.row_factory = sqlite3.Row
+        last_sent = time.monotonic()
+        try:
+            while True:
+                # Read the game before the moves: the winner is only set after the game's
+                # last moves are written, so a finished game here means no moves are missing.
+                game_info = conn.execute("SELECT winner, turns FROM games WHERE game_id = ?", (game_id,)).fetchone()
+                if game_info is None:
+                    yield f"event: end\ndata: {json.dumps({'error': 'Game not found'})}\n\n"
+                    return
+                moves = conn.execute(
+                    "SELECT turn, player_name, shot_row, shot_col, result FROM moves "
+                    "WHERE game_id = ? AND turn > ? ORDER BY turn ASC",
+                    (game_id, last_turn)
+                ).fetchall()
+                for move in moves:
+                    last_turn = move['turn']
+                    turn = {
+                        "turn": move['turn'],
+                        "player": move['player_name'],
+                        "shot": (move['shot_row'], move['shot_col']),
+                        "result": move['result'],
+                    }
+                    yield f"id: {last_turn}\nevent: turn\ndata: {json.dumps(turn)}\n\n"
+                    last_sent = time.monotonic()
+                if game_info['winner']:
+                    yield f"event: end\ndata: {json.dumps(dict(game_info))}\n\n"
+                    return
+                if time.monotonic() - last_sent > STREAM_KEEPALIVE_INTERVAL:
+                    yield ": keep-alive\n\n"
+                    last_sent = time.monotonic()
+                time.sleep(STREAM_POLL_INTERVAL)
+        finally:
+            conn.close()
+
+    return Response(
+        stream_with_context(events(last_turn)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/stats')
+def get_stats():
+    """Returns the leaderboard from the materialized per-player statistics, best win rate first."""
+    rows = query_db("SELECT * FROM player_stats")
+    leaderboard = [stats.leaderboard_row(row) for row in rows]
+    leaderboard.sort(key=lambda entry: (entry["win_rate"] or 0, entry["games"]), reverse=True)
+    return jsonify(leaderboard)
+
+@app.route('/api/stats/<string:player_name>')
+def get_player_stats(player_name):
+    """Returns the materialized statistics for one player."""
+    row = query_db("SELECT * FROM player_stats WHERE player_name = ?", [player_name], one=True)
+    if row is None:
+        return jsonify({"error": "Player not found"}), 404
+    return jsonify(stats.leaderboard_row(row))
+
+@app.route('/api/metrics')
+def get_metrics():
+    """
+    Returns LLM latency and token usage per player and model, slowest first. With
+    ?game_id= it returns the per-turn metrics of that game instead. ?player= filters by player.
+    """
+    if request.args.get('game_id'):
+        rows = query_db("SELECT * FROM move_metrics WHERE game_id = ? ORDER BY turn", [request.args['game_id']])
+        return jsonify([dict(row) for row in rows])
+
+    player_filter, args = "", []
+    if request.args.get('player'):
+        player_filter, args = " WHERE player_name = ?", [request.args['player']]
+    rows = query_db(f"""
+        SELECT player_name, provider, model,
+            COUNT(*) AS turns,
+            AVG(latency_ms) AS avg_latency_ms,
+            MAX(latency_ms) AS max_latency_ms,
+            AVG(provider_duration_ms) AS avg_provider_duration_ms,
+            SUM(attempts) AS attempts,
+            SUM(MAX(attempts - 1, 0)) AS retries,
+            SUM(prompt_tokens) AS prompt_tokens,
+            SUM(completion_tokens) AS completion_tokens,
+            SUM(cached) AS cached,
+            SUM(random_fallback) AS random_fallbacks
+        FROM move_metrics{player_filter}
+        GROUP BY player_name, provider, model
+    """, args)
+    metrics = []
+    for row in rows:
+        entry = dict(row)
+        for quantile in (50, 95):
+            # Nearest-rank percentile, read in order from idx_move_metrics_latency (no sort).
+            offset = max(0, (quantile * entry['turns'] + 99) // 100 - 1)
+            found = query_db(
+                "SELECT latency_ms FROM move_metrics WHERE player_name = ? AND provider IS ? AND model IS ? "
+                "ORDER BY latency_ms LIMIT 1 OFFSET ?",
+                [row['player_name'], row['provider'], row['model'], offset], one=True
+            )
+            entry[f'p{quantile}_latency_ms'] = found['latency_ms'] if found else None
+        entry['tokens_per_turn'] = ((entry['prompt_tokens'] or 0) + (entry['completion_tokens'] or 0)) / entry['turns']
+        metrics.append(entry)
+    metrics.sort(key=lambda entry: entry['avg_latency_ms'] or 0, reverse=True)
+    return jsonify(metrics)
 
 @app.route('/api/raw/<string:table_name>')
 def get_raw_table(table_name):
-    """Returns all data from a specified table."""
+    """
+    Streams the rows of a specified table in constant memory, reading the cursor in chunks.
+    ?format= picks 'json' (one array, the default), 'ndjson' (one object per line), 'csv',
+    or 'columnar' (one line per chunk holding a list per column). Rows can be restricted with
+    ?game_id_from= / ?game_id_to= (inclusive) and ?since= / ?until= (timestamps).
+    An ETag derived from the table's state lets clients revalidate without a re-read.
+    """
     # Whitelist allowed table names to prevent SQL injection
     if table_name not in ['games', 'boards', 'moves']:
         return jsonify({"error": "Invalid table name"}), 400
-    
-    data = query_db(f"SELECT * FROM {table_name}")
-    return jsonify([dict(ix) for ix in data])
+    export_format = request.args.get('format', 'json')
+    if export_format not in RAW_EXPORT_FORMATS:
+        return jsonify({"error": f"Invalid format. Expected one of {sorted(RAW_EXPORT_FORMATS)}"}), 400
+
+    conditions, args = [], []
+    try:
+        if request.args.get('game_id_from'):
+            conditions.append("game_id >= ?")
+            args.append(int(request.args['game_id_from']))
+        if request.args.get('game_id_to'):
+            conditions.append("game_id <= ?")
+            args.append(int(request.args['game_id_to']))
+    except ValueError:
+        return jsonify({"error": "game_id_from and game_id_to must be integers"}), 400
+    if request.args.get('since'):
+        conditions.append(RAW_EXPORT_TIME_FILTERS[table_name].format(op=">="))
+        args.append(request.args['since'])
+    if request.args.get('until'):
+        conditions.append(RAW_EXPORT_TIME_FILTERS[table_name].format(op="<"))
+        args.append(request.args['until'])
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    # Triggers count every insert, update and delete of the table (including the rows removed
+    # when a tournament discards an unfinished game), so its change counter identifies the
+    # table's state with a single primary-key lookup.
+    state = query_db("SELECT version FROM table_versions WHERE table_name = ?", [table_name], one=True)
+    etag = None
+    if state is not None:
+        etag = hashlib.sha1(f"{table_name}:{state['version']}:{request.query_string!r}".encode('utf-8')).hexdigest()
+    if etag is not None and request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    chunks = _export_chunks(f"SELECT * FROM {table_name}{where} ORDER BY rowid", args, export_format)
+    use_gzip = _accepts_gzip()
+    response = Response(
+        stream_with_context(_gzip_stream(chunks) if use_gzip else chunks),
+        mimetype=RAW_EXPORT_FORMATS[export_format]
+    )
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+    response.cache_control.no_cache = True
+    return response
+
+def _export_chunks(query, args, export_format):
+    """Yields a query's rows as text chunks in the requested export format."""
+    conn = sqlite3.connect(DB_FILE)
+    try:
+        cursor = conn.execute(query, args)
+        columns = [description[0] for description in cursor.description]
+        if export_format == 'json':
+            yield "["
+        elif export_format == 'csv':
+            yield _csv_text([columns])
+        first = True
+        while True:
+            rows = cursor.fetchmany(RAW_EXPORT_CHUNK_ROWS)
+            if not rows:
+                break
+            if export_format == 'json':
+                text = ",".join(json.dumps(dict(zip(columns, row))) for row in rows)
+                yield text if first else "," + text
+            elif export_format == 'ndjson':
+                yield "".join(json.dumps(dict(zip(columns, row))) + "\n" for row in rows)
+            elif export_format == 'csv':
+                yield _csv_text(rows)
+            else:
+                yield json.dumps({"columns": columns, "data": [list(values) for values in zip(*rows)]}) + "\n"
+            first = False
+        if export_format == 'json':
+            yield "]"
+    finally:
+        conn.close()
+
+def _csv_text(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+def _gzip_stream(chunks):
+    """Gzips a stream of text chunks on the fly."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) # wbits=31 writes a gzip header
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
 
 
 if __name__ == '__main__':
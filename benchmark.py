@@ -0,0 +1,44 @@
+import sys
+import json
+import argparse
+from src import benchmark
+
+def main():
+    """Runs the benchmark suite, writes the results file and compares it with a previous run."""
+    parser = argparse.ArgumentParser(description="Benchmarks for the game engine, database writes and API endpoints.")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the results.")
+    parser.add_argument("--compare", default=None, help="A previous results file to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown reported as a regression.")
+    parser.add_argument("--only", nargs="+", choices=["engine", "e2e", "api", "memory"], help="Run only these sections.")
+    parser.add_argument("--api-games", type=int, default=100_000, help="Games in the synthetic API database.")
+    parser.add_argument("--api-requests", type=int, default=200, help="Requests per API endpoint.")
+    parser.add_argument("--e2e-games", type=int, default=20, help="Bot games in the end-to-end run (a quarter as many LLM games).")
+    parser.add_argument("--engine-games", type=int, default=2000, help="Games in the engine benchmark.")
+    args = parser.parse_args()
+
+    results = benchmark.run_all(
+        api_games=args.api_games,
+        api_requests=args.api_requests,
+        e2e_games=args.e2e_games,
+        engine_games=args.engine_games,
+        sections=args.only,
+    )
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    for name, metric in results["metrics"].items():
+        print(f"{name}: {metric['value']:.4g} {metric['unit']}")
+    print(f"Results written to {args.output}.")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        lines, regressions = benchmark.compare(results, previous, args.threshold)
+        print(f"\nCompared with {args.compare} (commit {previous.get('commit')}):")
+        for line in lines:
+            print(f"  {line}")
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}.")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
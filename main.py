@@ -1,28 +1,15 @@
-import time
 import os
 import logging
-from src import config, database, game, llm
+from src import config, database, llm, logs, scheduler
 
 def setup_logging():
-    """Configures the root logger to write to all_logs.log."""
+    """Starts the background logging pipeline, writing to LOG_FILE."""
     # Wipe the log file for a clean run
-    if os.path.exists("all_logs.log"):
-        os.remove("all_logs.log")
+    if os.path.exists(config.LOG_FILE):
+        os.remove(config.LOG_FILE)
         print("Previous log file wiped.")
 
-    # Configure logging
-    log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    log_handler = logging.FileHandler('all_logs.log')
-    log_handler.setFormatter(log_formatter)
-    
-    # Get the root logger and add the handler
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.INFO)
-    
-    # Prevent duplicate handlers if this function is ever called again
-    if not root_logger.handlers:
-        root_logger.addHandler(log_handler)
-    
+    logs.setup_logging()
     logging.info("Logging configured.")
 
 
@@ -37,65 +24,22 @@ def run_simulation():
     # Initialize the database
     database.init_db()
 
-    player_configs = {
-        config.PLAYER1_CONFIG["name"]: config.PLAYER1_CONFIG,
-        config.PLAYER2_CONFIG["name"]: config.PLAYER2_CONFIG,
-    }
-
-    for i in range(config.NUMBER_OF_GAMES):
-        player1_name = config.PLAYER1_CONFIG["name"]
-        player2_name = config.PLAYER2_CONFIG["name"]
-        
-        game_id = database.create_new_game(player1_name, player2_name)
-        logging.info(f"--- Starting Game {game_id}/{config.NUMBER_OF_GAMES} ({player1_name} vs {player2_name}) ---")
-        print(f"\n--- Starting Game {game_id}/{config.NUMBER_OF_GAMES} ({player1_name} vs {player2_name}) ---")
-        
-        current_game = game.BattleshipGame(
-            game_id,
-            player1_name=player1_name,
-            player2_name=player2_name
-        )
-        
-        player_moves = {p_name: [] for p_name in player_configs.keys()}
-
-        while not current_game.winner:
-            current_game.turn += 1
-            current_player_name = current_game.player_names[(current_game.turn - 1) % 2]
-            current_player_config = player_configs[current_player_name]
-            
-            print(f"\nTurn {current_game.turn}: {current_player_name}'s move.")
-
-            opponent_view = current_game.get_opponent_view(current_player_name)
-            own_ships_status = [
-                {"name": s["name"], "length": s["length"], "hits": s["hits"], "sunk": s["sunk"]}
-                for s in current_game.players[current_player_name]["ships"]
-            ]
-
-            row, col = llm.get_llm_move(
-                current_player_name,
-                opponent_view,
-                own_ships_status,
-                player_moves[current_player_name]
-            )
-            
-            player_moves[current_player_name].append({"shot": (row, col)})
-            result = current_game.process_shot(current_player_name, row, col)
-            print(f"Result: {result}")
-            
-            player_moves[current_player_name][-1]["result"] = result
-            
-            # Apply the correct rate limit for the current player
-            sleep_time = current_player_config["api_sleep_time"]
-            if sleep_time > 0:
-                print(f"Waiting for {sleep_time} seconds...")
-                time.sleep(sleep_time)
-
-        logging.info(f"--- Game {game_id} Over! Winner: {current_game.winner} in {current_game.turn} turns. ---")
-        print(f"\n--- Game {game_id} Over! Winner: {current_game.winner} in {current_game.turn} turns. ---")
-        database.update_game_winner(game_id, current_game.winner, current_game.turn)
+    print(f"Running {config.NUMBER_OF_GAMES} games with up to {config.MAX_CONCURRENT_GAMES} in flight.")
+    try:
+        scheduler.run_tournament(config.PLAYER1_CONFIG, config.PLAYER2_CONFIG)
+    finally:
+        # Make sure buffered turns reach the database even if the run is interrupted.
+        database.close()
 
     print("\n--- Simulation Complete ---")
     logging.info("--- Simulation Complete ---")
+    for line in llm.prompt_size_report():
+        print(f"Prompt size: {line}")
+        logging.info(f"Prompt size: {line}")
+    for line in llm.batch_report():
+        print(f"Batching: {line}")
+        logging.info(f"Batching: {line}")
+    logs.shutdown_logging()
 
 if __name__ == "__main__":
     run_simulation()
\ No newline at end of file
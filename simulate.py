@@ -0,0 +1,23 @@
+import argparse
+from src import players, simulator
+
+def main():
+    """Runs a headless tournament between two baseline bots and prints the results."""
+    parser = argparse.ArgumentParser(description="Headless Battleship self-play between baseline bots.")
+    parser.add_argument("bot1", choices=sorted(players.BOTS))
+    parser.add_argument("bot2", choices=sorted(players.BOTS))
+    parser.add_argument("--games", type=int, default=10000, help="Number of games to play.")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: all cores).")
+    parser.add_argument("--seed", type=int, default=None, help="Base seed for reproducible runs.")
+    args = parser.parse_args()
+
+    summary = simulator.run_headless(args.bot1, args.bot2, args.games, processes=args.processes, seed=args.seed)
+
+    print(f"Played {summary['games']} games in {summary['elapsed_seconds']:.1f}s "
+          f"({summary['games_per_hour']:,.0f} games/hour, seed {summary['seed']}).")
+    for bot in summary["bots"]:
+        avg_turns = f"{bot['avg_turns_to_win']:.1f}" if bot["avg_turns_to_win"] else "-"
+        print(f"  {bot['name']}: {bot['wins']} wins ({bot['win_rate']:.1%}), avg turns to win {avg_turns}")
+
+if __name__ == "__main__":
+    main()
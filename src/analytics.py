@@ -0,0 +1,291 @@
+import os
+import json
+import sqlite3
+import logging
+import numpy as np
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# Offline analytics over finished games. export() converts the games, boards and moves tables
+# into one .npy file per column (strings become small integer codes listed in meta.json);
+# load() memory-maps them, so the queries below read only the columns they use and run as
+# vectorized NumPy operations however many shots there are.
+
+RESULT_CODES = {"MISS": 0, "HIT": 1, "SUNK": 2, "DUPLICATE": 3}
+EXPORT_CHUNK_ROWS = 50_000
+
+# Column dtypes of the exported tables. Indexes into meta.json lists are -1 when missing.
+COLUMNS = {
+    "games": {
+        "game_id": np.int64,
+        "player1": np.int32,   # index into meta["players"]
+        "player2": np.int32,
+        "model1": np.int32,    # index into meta["models"]
+        "model2": np.int32,
+        "winner_seat": np.int8, # 0, 1, or -1
+        "turns": np.int32,
+        "seed": np.int64,
+        "response_cache": np.int8,
+    },
+    "moves": {
+        "game": np.int32,      # row of the game in the games arrays
+        "turn": np.int32,
+        "seat": np.int8,       # 0 for player 1, 1 for player 2
+        "player": np.int32,
+        "model": np.int32,
+        "shot": np.int32,      # the shooter's own shot number in the game, from 1
+        "row": np.int16,
+        "col": np.int16,
+        "result": np.int8,     # RESULT_CODES
+        "sunk_ship": np.int16, # index into meta["ships"] for SUNK results
+        "random_fallback": np.int8,
+    },
+    "boards": {
+        "game": np.int32,
+        "seat": np.int8,
+        "ships": np.uint8,     # (boards, GRID_SIZE, GRID_SIZE); 1 where a ship starts the game
+    },
+}
+
+
+# --- Export ---
+
+class _Codes:
+    """Assigns consecutive integer codes to strings, in order of first appearance."""
+    def __init__(self):
+        self.values = []
+        self.index = {}
+
+    def code(self, value):
+        if value is None:
+            return -1
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def _model_label(settings, player_name):
+    """The model a seat played with: its configured model, the bot strategy, or the player name."""
+    player_settings = settings.get(player_name) or {}
+    if player_settings.get("provider") == "bot":
+        return f"bot:{player_settings.get('strategy')}"
+    return player_settings.get("model") or player_name
+
+
+def _open_columns(out_dir, table, rows, grid_size):
+    os.makedirs(os.path.join(out_dir, table), exist_ok=True)
+    columns = {}
+    for name, dtype in COLUMNS[table].items():
+        shape = (rows, grid_size, grid_size) if (table, name) == ("boards", "ships") else (rows,)
+        columns[name] = np.lib.format.open_memmap(os.path.join(out_dir, table, f"{name}.npy"), mode="w+", dtype=dtype, shape=shape)
+    return columns
+
+
+def export(out_dir=None, db_file=None):
+    """
+    Writes the finished games (those with a winner) and their boards and moves to `out_dir`
+    (default ANALYTICS_DIR) as memory-mappable .npy columns. Rows are streamed from SQLite in
+    chunks straight into the files, so memory use stays flat. Returns the row counts.
+    """
+    out_dir = config.ANALYTICS_DIR if out_dir is None else out_dir
+    grid_size = config.GRID_SIZE
+    conn = sqlite3.connect(db_file or config.DB_FILE)
+    players, models, ships = _Codes(), _Codes(), _Codes()
+    try:
+        # One read transaction for every query below: games that finish during the export
+        # are left out of all three tables instead of showing up in moves without a game row.
+        conn.execute("BEGIN")
+        finished = "SELECT game_id FROM games WHERE winner IS NOT NULL"
+        game_rows = conn.execute(
+            "SELECT game_id, player1_name, player2_name, settings, winner, turns, seed, response_cache "
+            "FROM games WHERE winner IS NOT NULL ORDER BY game_id"
+        ).fetchall()
+        games = _open_columns(out_dir, "games", len(game_rows), grid_size)
+        game_index, seat_models = {}, {}
+        for i, (game_id, player1, player2, settings, winner, turns, seed, response_cache) in enumerate(game_rows):
+            settings = json.loads(settings) if settings else {}
+            model1, model2 = models.code(_model_label(settings, player1)), models.code(_model_label(settings, player2))
+            games["game_id"][i] = game_id
+            games["player1"][i] = players.code(player1)
+            games["player2"][i] = players.code(player2)
+            games["model1"][i], games["model2"][i] = model1, model2
+            games["winner_seat"][i] = 0 if winner == player1 else 1 if winner == player2 else -1
+            games["turns"][i] = turns or 0
+            games["seed"][i] = -1 if seed is None else seed
+            games["response_cache"][i] = response_cache or 0
+            game_index[game_id] = i
+            seat_models[game_id] = (player1, model1, model2)
+        del game_rows
+
+        move_count = conn.execute(f"SELECT COUNT(*) FROM moves WHERE game_id IN ({finished})").fetchone()[0]
+        moves = _open_columns(out_dir, "moves", move_count, grid_size)
+        cursor = conn.execute(
+            "SELECT game_id, turn, player_name, shot_row, shot_col, result, COALESCE(random_fallback, 0) "
+            f"FROM moves WHERE game_id IN ({finished}) ORDER BY game_id, turn"
+        )
+        shot_counts = {}
+        position = 0
+        while True:
+            chunk = cursor.fetchmany(EXPORT_CHUNK_ROWS)
+            if not chunk:
+                break
+            columns = {name: [] for name in COLUMNS["moves"]}
+            for game_id, turn, player_name, row, col, result, random_fallback in chunk:
+                player1, model1, model2 = seat_models[game_id]
+                seat = 0 if player_name == player1 else 1
+                key = (game_id, seat)
+                shot_counts[key] = shot_counts.get(key, 0) + 1
+                kind, _, ship = result.partition(" ")
+                columns["game"].append(game_index[game_id])
+                columns["turn"].append(turn)
+                columns["seat"].append(seat)
+                columns["player"].append(players.code(player_name))
+                columns["model"].append(model2 if seat else model1)
+                columns["shot"].append(shot_counts[key])
+                columns["row"].append(row)
+                columns["col"].append(col)
+                columns["result"].append(RESULT_CODES[kind])
+                columns["sunk_ship"].append(ships.code(ship) if ship else -1)
+                columns["random_fallback"].append(random_fallback)
+            for name, values in columns.items():
+                moves[name][position:position + len(chunk)] = values
+            position += len(chunk)
+            # Moves are ordered by game, so counters of earlier games are no longer needed.
+            shot_counts = {key: count for key, count in shot_counts.items() if key[0] == game_id}
+
+        # Boards of games played on another grid size are left out.
+        board_filter = f"WHERE game_id IN ({finished}) AND json_array_length(ship_placements) = {grid_size}"
+        board_count = conn.execute(f"SELECT COUNT(*) FROM boards {board_filter}").fetchone()[0]
+        boards = _open_columns(out_dir, "boards", board_count, grid_size)
+        cursor = conn.execute(f"SELECT game_id, player_name, ship_placements FROM boards {board_filter} ORDER BY game_id, board_id")
+        for i, (game_id, player_name, placements) in enumerate(cursor):
+            boards["game"][i] = game_index[game_id]
+            boards["seat"][i] = 0 if player_name == seat_models[game_id][0] else 1
+            boards["ships"][i] = np.frombuffer("".join(map("".join, json.loads(placements))).encode(), dtype=np.uint8).reshape(
+                grid_size, grid_size
+            ) == ord("S")
+        conn.commit()
+    finally:
+        conn.close()
+
+    counts = {"games": len(game_index), "moves": move_count, "boards": board_count}
+    for table in (games, moves, boards):
+        for column in table.values():
+            column.flush()
+    meta = {
+        "grid_size": grid_size,
+        "players": players.values,
+        "models": models.values,
+        "ships": ships.values,
+        "results": list(RESULT_CODES),
+        "counts": counts,
+    }
+    # meta.json is written last, so a directory with one holds a complete export.
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    logger.info(f"Exported {counts} to {out_dir}.")
+    return counts
+
+
+def load(out_dir=None):
+    """
+    Memory-maps an export. Returns {"meta": meta, "games": {column: array}, "moves": ..., "boards": ...};
+    the arrays are read-only and only the pages a query touches are read from disk.
+    """
+    out_dir = config.ANALYTICS_DIR if out_dir is None else out_dir
+    with open(os.path.join(out_dir, "meta.json")) as f:
+        data = {"meta": json.load(f)}
+    for table, columns in COLUMNS.items():
+        data[table] = {name: np.load(os.path.join(out_dir, table, f"{name}.npy"), mmap_mode="r") for name in columns}
+    return data
+
+
+# --- Queries ---
+
+def _label_codes(data, by):
+    if by not in ("model", "player"):
+        raise ValueError(f"Unknown grouping '{by}'. Expected 'model' or 'player'.")
+    return data["meta"][f"{by}s"], data["moves"][by]
+
+
+def _move_mask(data, model=None, player=None):
+    """Boolean mask over moves, restricted to one model and/or one player name."""
+    mask = np.ones(len(data["moves"]["turn"]), dtype=bool)
+    for by, value in (("model", model), ("player", player)):
+        if value is not None:
+            labels, codes = _label_codes(data, by)
+            mask &= codes == (labels.index(value) if value in labels else -2)
+    return mask
+
+
+def _hits(result):
+    return (result == RESULT_CODES["HIT"]) | (result == RESULT_CODES["SUNK"])
+
+
+def _group(values, codes, labels):
+    """Splits `values` by the label code of each entry. Returns {label: array}."""
+    order = np.argsort(codes, kind="stable")
+    boundaries = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+    return {
+        label: values[order[boundaries[i]:boundaries[i + 1]]]
+        for i, label in enumerate(labels) if boundaries[i + 1] > boundaries[i]
+    }
+
+
+def shot_heatmap(data, model=None, player=None, hits_only=False):
+    """Counts the shots fired at every cell, as a GRID_SIZE x GRID_SIZE array. Duplicate shots are left out."""
+    moves = data["moves"]
+    size = data["meta"]["grid_size"]
+    mask = _move_mask(data, model, player)
+    mask &= _hits(moves["result"]) if hits_only else moves["result"] != RESULT_CODES["DUPLICATE"]
+    cells = moves["row"][mask].astype(np.int64) * size + moves["col"][mask]
+    return np.bincount(cells, minlength=size * size).reshape(size, size)
+
+
+def ship_heatmap(data):
+    """How often each cell holds a ship at the start of a game, as a fraction of all boards."""
+    ships = data["boards"]["ships"]
+    return ships.mean(axis=0) if len(ships) else np.zeros((data["meta"]["grid_size"],) * 2)
+
+
+def turn_to_sink(data, by="model", ship=None):
+    """
+    Returns {label: shot numbers} with, for every enemy ship sunk, how many shots its sinker had
+    fired in that game. `ship` restricts the distribution to one ship name.
+    """
+    labels, codes = _label_codes(data, by)
+    moves = data["moves"]
+    mask = moves["result"] == RESULT_CODES["SUNK"]
+    if ship is not None:
+        ships = data["meta"]["ships"]
+        mask &= moves["sunk_ship"] == (ships.index(ship) if ship in ships else -2)
+    return _group(np.asarray(moves["shot"][mask]), np.asarray(codes[mask]), labels)
+
+
+def first_hit_latency(data, by="model"):
+    """Returns {label: shot numbers} with the shot of each player's first hit in every game that had one."""
+    labels, codes = _label_codes(data, by)
+    moves = data["moves"]
+    hit_rows = np.flatnonzero(_hits(moves["result"]))
+    # Moves are stored in (game, turn) order, so the first hit row of each (game, seat) is its first hit.
+    keys = moves["game"][hit_rows].astype(np.int64) * 2 + moves["seat"][hit_rows]
+    _, first = np.unique(keys, return_index=True)
+    rows = hit_rows[first]
+    return _group(np.asarray(moves["shot"][rows]), np.asarray(codes[rows]), labels)
+
+
+def summarize(distributions):
+    """Condenses {label: values} into {label: {count, mean, p50, p90, max}}."""
+    return {
+        label: {
+            "count": int(len(values)),
+            "mean": float(values.mean()),
+            "p50": float(np.percentile(values, 50)),
+            "p90": float(np.percentile(values, 90)),
+            "max": int(values.max()),
+        }
+        for label, values in distributions.items() if len(values)
+    }
@@ -0,0 +1,95 @@
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class MoveBatcher:
+    """
+    Collects move requests from concurrent games and hands them to `handler` in batches.
+    A batch is dispatched once `max_batch_size` requests are pending or `max_wait` seconds
+    after its first request arrived. While one batch is in flight the next one fills up,
+    so batches grow on their own when the provider is the bottleneck.
+
+    `handler(requests)` must return one result per request, in order; a result that is an
+    Exception is raised in the submitting thread instead of returned. A result may also be a
+    Future: its request is then answered as soon as that Future completes, without waiting
+    for the rest of the batch, and the next batch is collected in the meantime.
+    """
+    def __init__(self, name, handler, max_batch_size, max_wait):
+        self.name = name
+        self.handler = handler
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.pending = queue.Queue()
+        self.batches = 0
+        self.requests = 0
+        self.largest_batch = 0
+        self._worker = threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True)
+        self._worker.start()
+
+    def submit(self, request):
+        """Queues one request and blocks until its result is available."""
+        future = Future()
+        self.pending.put((request, future))
+        return future.result()
+
+    def _collect(self):
+        """Waits for a first request, then gathers more until the batch is full or max_wait has passed."""
+        batch = [self.pending.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.pending.get(timeout=remaining) if remaining > 0 else self.pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            requests = [request for request, _ in batch]
+            try:
+                results = self.handler(requests)
+            except Exception as e:
+                results = [e] * len(batch)
+            self.batches += 1
+            self.requests += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            logger.info(f"Batcher '{self.name}' dispatched {len(batch)} requests.")
+            for (_, future), result in zip(batch, results):
+                if isinstance(result, Future):
+                    result.add_done_callback(lambda done, future=future: _resolve(future, done.exception() or done.result()))
+                else:
+                    _resolve(future, result)
+
+    def report(self):
+        """Returns a one-line summary of the batch sizes seen so far."""
+        average = self.requests / self.batches if self.batches else 0.0
+        return f"{self.name}: {self.requests} requests in {self.batches} batches (avg {average:.1f}, max {self.largest_batch})"
+
+
+def _resolve(future, result):
+    if isinstance(result, BaseException):
+        future.set_exception(result)
+    else:
+        future.set_result(result)
+
+
+def concurrent_handler(call, max_workers):
+    """
+    Builds a batch handler that runs `call(request)` for every request of a batch at the same
+    time. This is the local stand-in for a provider batch endpoint: the batch reaches the
+    provider together, which lets a server with parallel slots (such as Ollama) decode it jointly.
+    Each call's Future is returned right away, so every game gets its answer as soon as its own
+    call is done instead of waiting for the slowest call of the batch.
+    """
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch-call")
+
+    def handler(requests):
+        return [executor.submit(call, request) for request in requests]
+    return handler
@@ -0,0 +1,358 @@
+import io
+import os
+import gc
+import json
+import time
+import random
+import sqlite3
+import platform
+import tempfile
+import threading
+import contextlib
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from . import config, database, game, layouts, players, scheduler, stats
+
+# Benchmarks for the engine, the database write path and the API read paths. Every metric
+# is stored as {"value", "unit", "higher_is_better"} so two results files can be compared.
+
+
+# --- Mock LLM Provider ---
+
+class _MockOllamaHandler(BaseHTTPRequestHandler):
+    """Answers /api/generate like Ollama, picking a random untargeted cell from a 'rows' prompt."""
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = payload.get("prompt", "")
+        water = [
+            (int(row), col)
+            for row, cells in (line.split(": ", 1) for line in prompt.splitlines() if line[:1].isdigit() and ": " in line)
+            if row.isdigit()
+            for col, cell in enumerate(cells.strip())
+            if cell == "W"
+        ]
+        row, col = random.choice(water) if water else (random.randrange(config.GRID_SIZE), random.randrange(config.GRID_SIZE))
+        body = json.dumps({
+            "response": json.dumps({"row": row, "col": col}),
+            "prompt_eval_count": len(prompt) // 4,
+            "eval_count": 12,
+            "total_duration": 1_000_000,
+            "done": True,
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextlib.contextmanager
+def mock_ollama_server():
+    """Runs a mock Ollama server on a free local port and yields its /api/generate URL."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MockOllamaHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="mock-ollama", daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _metric(value, unit, higher_is_better):
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+
+
+# --- Engine ---
+
+def bench_engine(games=2000, seed=0):
+    """Shots per second through BattleshipGame.process_shot, without players or the database."""
+    rng = random.Random(seed)
+    cells = [(r, c) for r in range(config.GRID_SIZE) for c in range(config.GRID_SIZE)]
+    orders = []
+    for _ in range(games):
+        order = cells[:]
+        rng.shuffle(order)
+        orders.append(order)
+    boards = [game.BattleshipGame(None, "A", "B", record=False, seed=rng.randrange(2**63)) for _ in range(games)]
+
+    shots = 0
+    start = time.perf_counter()
+    for current_game, order in zip(boards, orders):
+        for row, col in order:
+            current_game.process_shot("A", row, col)
+            current_game.process_shot("B", row, col)
+            shots += 2
+            if current_game.winner:
+                break
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(games):
+        layouts.random_layout(rng)
+    layout_elapsed = time.perf_counter() - start
+    return {
+        "engine_shots_per_sec": _metric(shots / elapsed, "shots/s", True),
+        "layout_generation_us": _metric(layout_elapsed / games * 1e6, "us", False),
+    }
+
+
+# --- End to End ---
+
+def _tournament_turns_per_second(player1_config, player2_config, games, concurrency):
+    """Plays a recorded tournament into a temporary database and returns turns per second."""
+    db_dir = tempfile.mkdtemp(prefix="battleship-bench-")
+    saved_db_file = config.DB_FILE
+    config.DB_FILE = os.path.join(db_dir, "bench.db")
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            database.init_db()
+            start = time.perf_counter()
+            results = scheduler.run_tournament(player1_config, player2_config, games, concurrency)
+            database.close()
+            elapsed = time.perf_counter() - start
+    finally:
+        database.close()
+        config.DB_FILE = saved_db_file
+    return sum(turns for _, _, turns in results) / elapsed
+
+
+def bench_end_to_end(games=20, concurrency=4):
+    """Turns per second for whole recorded games: bots only, and LLM players against the mock provider."""
+    from . import llm
+
+    bot1 = {"name": "Bench-Parity", "provider": "bot", "strategy": "parity"}
+    bot2 = {"name": "Bench-Random", "provider": "bot", "strategy": "random"}
+    results = {
+        "e2e_bot_turns_per_sec": _metric(_tournament_turns_per_second(bot1, bot2, games, concurrency), "turns/s", True),
+    }
+
+    with mock_ollama_server() as api_base:
+        llm_players = [
+            {
+                "name": f"Bench-LLM-{seat}",
+                "provider": "ollama",
+                "model": "mock",
+                "api_key_env": None,
+                "api_base": api_base,
+                "requests_per_minute": None,
+                "tokens_per_minute": None,
+                "temperature": 0.0,
+                "board_format": "rows",
+            }
+            for seat in (1, 2)
+        ]
+        saved_players = config.PLAYER1_CONFIG, config.PLAYER2_CONFIG
+        config.PLAYER1_CONFIG, config.PLAYER2_CONFIG = llm_players
+        try:
+            llm.initialize_models()
+        finally:
+            config.PLAYER1_CONFIG, config.PLAYER2_CONFIG = saved_players
+        turns_per_second = _tournament_turns_per_second(*llm_players, max(1, games // 4), concurrency)
+    results["e2e_llm_turns_per_sec"] = _metric(turns_per_second, "turns/s", True)
+    return results
+
+
+# --- API ---
+
+def build_synthetic_db(path, games=100_000, templates=200, seed=0):
+    """
+    Fills a database with `games` finished games. Real games between two bots are played as
+    templates and copied under new ids, so boards, moves and results stay consistent.
+    """
+    saved_db_file = config.DB_FILE
+    config.DB_FILE = path
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            database.init_db()
+    finally:
+        config.DB_FILE = saved_db_file
+
+    rng = random.Random(seed)
+    names = ["Bench-Parity", "Bench-Probability", "Bench-Random", "Bench-HuntTarget"]
+    strategies = ["parity", "probability", "random", "hunt_target"]
+    played = []
+    for _ in range(templates):
+        seats = rng.sample(range(len(names)), 2)
+        current_game = game.BattleshipGame(None, names[seats[0]], names[seats[1]], record=False, seed=rng.randrange(2**63))
+        bots = [players.BOTS[strategies[s]](names[s], seed=rng.random()) for s in seats]
+        past_moves = ([], [])
+        moves = []
+        while not current_game.winner:
+            current_game.turn += 1
+            seat = (current_game.turn - 1) % 2
+            row, col = bots[seat].choose_shot(current_game, past_moves[seat])
+            result = current_game.process_shot(bots[seat].name, row, col)
+            past_moves[seat].append({"shot": (row, col), "result": result})
+            moves.append((current_game.turn, bots[seat].name, row, col, result))
+        played.append((current_game, moves))
+
+    conn = sqlite3.connect(path)
+    with conn:
+        for game_id in range(1, games + 1):
+            template, moves = played[(game_id - 1) % templates]
+            p1, p2 = template.player_names
+            conn.execute(
+                "INSERT INTO games (game_id, winner, turns, end_time, player1_name, player2_name, seed) "
+                "VALUES (?, ?, ?, CURRENT_TIMESTAMP, ?, ?, ?)",
+                (game_id, template.winner, template.turn, p1, p2, template.seed)
+            )
+            conn.executemany(
+                "INSERT INTO boards (game_id, player_name, ship_placements) VALUES (?, ?, ?)",
+                [(game_id, name, json.dumps(data["board"].to_grid())) for name, data in template.players.items()]
+            )
+            conn.executemany(
+                "INSERT INTO moves (game_id, turn, player_name, shot_row, shot_col, result) VALUES (?, ?, ?, ?, ?, ?)",
+                [(game_id, *move) for move in moves]
+            )
+        stats.backfill(conn)
+    conn.close()
+
+
+def _percentile(samples, quantile):
+    ordered = sorted(samples)
+    return ordered[max(0, min(len(ordered) - 1, round(quantile / 100 * len(ordered)) - 1))]
+
+
+def _raw_range_url(first_game):
+    return f"/api/raw/moves?format=ndjson&game_id_from={first_game}&game_id_to={first_game + 10}"
+
+
+def bench_api(db_path, requests_per_endpoint=200, seed=0):
+    """p50/p99 latency of each API endpoint against `db_path`, through Flask's test client."""
+    import api
+
+    rng = random.Random(seed)
+    saved_db_file = api.DB_FILE
+    api.DB_FILE = db_path
+    api._finished_games = api._FinishedGameCache(api.FINISHED_GAME_CACHE_MAX_BYTES)
+    try:
+        total_games = api.query_db("SELECT MAX(game_id) AS n FROM games", one=True)["n"] or 1
+        player = api.query_db("SELECT player_name FROM player_stats LIMIT 1", one=True)
+        player = player["player_name"] if player else "none"
+        hot_game = rng.randint(1, total_games)
+        endpoints = {
+            "summary": lambda: "/api/summary",
+            "games_page": lambda: "/api/games",
+            "games_deep_page": lambda: f"/api/games?before={rng.randint(2, total_games)}",
+            "games_by_player": lambda: f"/api/games?player={player}",
+            "game_cold": lambda: f"/api/game/{rng.randint(1, total_games)}",
+            "game_cached": lambda: f"/api/game/{hot_game}",
+            "latest_id": lambda: "/api/game/latest/id",
+            "stats": lambda: "/api/stats",
+            "player_stats": lambda: f"/api/stats/{player}",
+            "metrics": lambda: "/api/metrics",
+            "raw_moves_range": lambda: _raw_range_url(rng.randint(1, total_games)),
+        }
+        client = api.app.test_client()
+        results = {}
+        for name, make_url in endpoints.items():
+            samples = []
+            for _ in range(requests_per_endpoint):
+                url = make_url()
+                start = time.perf_counter()
+                response = client.get(url)
+                response.get_data()
+                samples.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{url} returned {response.status_code}")
+            results[f"api_{name}_p50_ms"] = _metric(_percentile(samples, 50), "ms", False)
+            results[f"api_{name}_p99_ms"] = _metric(_percentile(samples, 99), "ms", False)
+        return results
+    finally:
+        api.DB_FILE = saved_db_file
+
+
+# --- Memory ---
+
+def bench_memory(games=1000, seed=0):
+    """Bytes held per game object, freshly created and after being played to the end."""
+    rng = random.Random(seed)
+    cells = [(r, c) for r in range(config.GRID_SIZE) for c in range(config.GRID_SIZE)]
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = [game.BattleshipGame(None, "A", "B", record=False, seed=rng.randrange(2**63)) for _ in range(games)]
+        fresh = (tracemalloc.get_traced_memory()[0] - before) / games
+        for current_game in kept:
+            order = cells[:]
+            rng.shuffle(order)
+            for row, col in order:
+                current_game.process_shot("A", row, col)
+                current_game.process_shot("B", row, col)
+                if current_game.winner:
+                    break
+        gc.collect()
+        played = (tracemalloc.get_traced_memory()[0] - before) / games
+    finally:
+        tracemalloc.stop()
+    return {
+        "memory_per_new_game_bytes": _metric(fresh, "bytes", False),
+        "memory_per_finished_game_bytes": _metric(played, "bytes", False),
+    }
+
+
+# --- Results ---
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_all(api_games=100_000, api_requests=200, e2e_games=20, engine_games=2000, data_dir="benchmark_data", sections=None):
+    """Runs the selected benchmark sections (all by default) and returns the results document."""
+    sections = sections or ("engine", "e2e", "api", "memory")
+    metrics = {}
+    if "engine" in sections:
+        metrics.update(bench_engine(engine_games))
+    if "e2e" in sections:
+        metrics.update(bench_end_to_end(e2e_games))
+    if "api" in sections:
+        os.makedirs(data_dir, exist_ok=True)
+        db_path = os.path.join(data_dir, f"synthetic_{api_games}.db")
+        if not os.path.exists(db_path):
+            print(f"Building a synthetic database with {api_games} games in {db_path} (reused by later runs)...")
+            build_synthetic_db(db_path + ".tmp", api_games)
+            os.replace(db_path + ".tmp", db_path)
+        metrics.update(bench_api(db_path, api_requests))
+    if "memory" in sections:
+        metrics.update(bench_memory())
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {"api_games": api_games, "api_requests": api_requests, "e2e_games": e2e_games, "engine_games": engine_games},
+        "metrics": metrics,
+    }
+
+
+def compare(current, previous, threshold=0.10):
+    """
+    Compares two results documents. Returns (lines, regressions): one line per metric present
+    in both, and the names of metrics that got worse by more than `threshold` (a fraction).
+    """
+    lines, regressions = [], []
+    for name, metric in current["metrics"].items():
+        old = previous.get("metrics", {}).get(name)
+        if not old or not old["value"]:
+            continue
+        change = (metric["value"] - old["value"]) / old["value"]
+        worse = -change if metric["higher_is_better"] else change
+        flag = ""
+        if worse > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        lines.append(f"{name}: {old['value']:.4g} -> {metric['value']:.4g} {metric['unit']} ({change:+.1%}){flag}")
+    return lines, regressions
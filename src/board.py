@@ -0,0 +1,111 @@
+WATER, SHIP, HIT, MISS = 0, 1, 2, 3
+
+# Translation tables from cell codes to the one-character symbols used in prompts and the database.
+_FULL_SYMBOLS = bytes.maketrans(bytes([WATER, SHIP, HIT, MISS]), b"WSHM")
+_VIEW_SYMBOLS = bytes.maketrans(bytes([WATER, SHIP, HIT, MISS]), b"WWHM")
+
+
+class Board:
+    """
+    One player's waters. Cell states live in a flat bytearray (index = row * size + col)
+    for O(1) lookups, mirrored by integer bitmasks for whole-board set operations.
+    String grids are only rendered on demand; the opponent's view, once requested, is
+    kept up to date as shots land.
+    """
+    __slots__ = ("size", "cells", "ship_ids", "ships", "hits", "misses", "view")
+
+    def __init__(self, size):
+        self.size = size
+        self.cells = bytearray(size * size)
+        self.ship_ids = {}  # cell index -> index of the ship occupying it
+        self.ships = 0      # bitmask of cells holding a ship
+        self.hits = 0       # bitmask of cells that were hit
+        self.misses = 0     # bitmask of cells that were missed
+        self.view = None    # immutable opponent view, created by view_rows()
+
+    def index(self, row, col):
+        """Returns the flat cell index of (row, col)."""
+        return row * self.size + col
+
+    def placement_mask(self, length, row, col, horizontal):
+        """Returns the bitmask covered by a ship, or None if it would leave the board."""
+        if horizontal:
+            if col + length > self.size: return None
+            return ((1 << length) - 1) << self.index(row, col)
+        if row + length > self.size: return None
+        start = self.index(row, col)
+        mask = 0
+        for i in range(length):
+            mask |= 1 << (start + i * self.size)
+        return mask
+
+    def can_place(self, mask):
+        """Checks that a placement mask does not collide with an existing ship."""
+        return mask is not None and not self.ships & mask
+
+    def place(self, ship_index, mask):
+        """Marks every cell of `mask` as belonging to ship `ship_index`. Returns the cell positions."""
+        self.ships |= mask
+        positions = []
+        remaining = mask
+        while remaining:
+            low_bit = remaining & -remaining
+            idx = low_bit.bit_length() - 1
+            remaining ^= low_bit
+            self.cells[idx] = SHIP
+            self.ship_ids[idx] = ship_index
+            positions.append(divmod(idx, self.size))
+        return positions
+
+    def fire(self, row, col):
+        """
+        Applies a shot. Returns the index of the ship that was hit, -1 for a miss,
+        or None if the cell had already been targeted.
+        """
+        idx = self.index(row, col)
+        state = self.cells[idx]
+        if state == SHIP:
+            self.cells[idx] = HIT
+            self.hits |= 1 << idx
+            if self.view is not None:
+                self._mark_view(row, col, "H")
+            return self.ship_ids[idx]
+        if state == WATER:
+            self.cells[idx] = MISS
+            self.misses |= 1 << idx
+            if self.view is not None:
+                self._mark_view(row, col, "M")
+            return -1
+        return None
+
+    def is_targeted(self, row, col):
+        """Checks whether a cell has already been shot at."""
+        return self.cells[self.index(row, col)] >= HIT
+
+    def _render(self, table):
+        """Renders the cells as a list of rows of one-character strings."""
+        text = self.cells.translate(table).decode("ascii")
+        n = self.size
+        return [list(text[r * n:(r + 1) * n]) for r in range(n)]
+
+    def to_grid(self):
+        """Returns the full board with ships visible ('W', 'S', 'H', 'M')."""
+        return self._render(_FULL_SYMBOLS)
+
+    def view_grid(self):
+        """Returns a fresh copy of the board as the opponent sees it ('W', 'H', 'M'; ships hidden)."""
+        return self._render(_VIEW_SYMBOLS)
+
+    def view_rows(self):
+        """
+        Returns the opponent view as a tuple of row tuples. It is rendered once; after that each
+        shot replaces only the row it hit, so earlier views stay valid as immutable snapshots
+        (use view_grid() for a mutable copy).
+        """
+        if self.view is None:
+            self.view = tuple(map(tuple, self._render(_VIEW_SYMBOLS)))
+        return self.view
+
+    def _mark_view(self, row, col, symbol):
+        cells = self.view[row]
+        self.view = self.view[:row] + (cells[:col] + (symbol,) + cells[col + 1:],) + self.view[row + 1:]
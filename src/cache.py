@@ -0,0 +1,87 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from . import config
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache of parsed LLM moves. Entries are keyed on the provider,
+    model, temperature and a whitespace-normalized prompt hash, expire after `ttl` seconds,
+    and the least recently used entries are evicted beyond `max_entries`.
+    """
+    EVICT_EVERY = 100 # Puts between eviction passes
+
+    def __init__(self, path=None, max_entries=None, ttl=None):
+        self.max_entries = config.RESPONSE_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.ttl = config.RESPONSE_CACHE_TTL if ttl is None else ttl
+        self.conn = sqlite3.connect(path or config.RESPONSE_CACHE_FILE, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.lock = threading.Lock()
+        self._puts = 0
+        with self.conn:
+            self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                shot_row INTEGER,
+                shot_col INTEGER,
+                created REAL,
+                last_used REAL
+            )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)")
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(provider, model, temperature, prompt):
+        """Returns the cache key for a decision state."""
+        normalized_prompt = " ".join(prompt.split())
+        payload = json.dumps([provider, model, temperature, normalized_prompt])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Returns the cached (row, col) for `key`, or None if it is missing or expired."""
+        now = time.time()
+        with self.lock, self.conn:
+            found = self.conn.execute(
+                "SELECT shot_row, shot_col, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if found is None:
+                self.misses += 1
+                return None
+            if self.ttl and now - found[2] > self.ttl:
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return found[0], found[1]
+
+    def put(self, key, move):
+        """Stores a validated (row, col) answer for `key`."""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, shot_row, shot_col, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, move[0], move[1], now, now)
+            )
+            self._puts += 1
+            if self._puts % self.EVICT_EVERY == 0:
+                self._evict(now)
+
+    def _evict(self, now):
+        """Drops expired entries and the least recently used ones beyond max_entries."""
+        if self.ttl:
+            self.conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        self.conn.execute(
+            "DELETE FROM responses WHERE key IN "
+            "(SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
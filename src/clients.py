@@ -0,0 +1,51 @@
+import asyncio
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from . import config
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaClient:
+    """
+    HTTP client for an Ollama server that reuses keep-alive connections.
+    One client is built per player in llm.initialize_models and shared by every move.
+    """
+    def __init__(self, api_base, pool_size=None, connect_timeout=None, read_timeout=None):
+        self.api_base = api_base
+        # Chat sessions use /api/chat on the same server as the configured /api/generate endpoint.
+        self.chat_url = api_base.rsplit("/api/", 1)[0] + "/api/chat" if "/api/" in api_base else api_base
+        self.timeout = (
+            config.LLM_CONNECT_TIMEOUT if connect_timeout is None else connect_timeout,
+            config.LLM_REQUEST_TIMEOUT if read_timeout is None else read_timeout,
+        )
+        pool_size = config.OLLAMA_POOL_SIZE if pool_size is None else pool_size
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def generate(self, payload):
+        """Sends a request to the Ollama API and returns the decoded JSON body."""
+        response = self.session.post(self.api_base, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def chat(self, payload):
+        """Sends a request to the Ollama chat API and returns the decoded JSON body."""
+        response = self.session.post(self.chat_url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    async def agenerate(self, payload):
+        """Async variant of generate() for use from an asyncio event loop.
+
+        The request runs on a worker thread, so it still draws from the same
+        connection pool as the synchronous calls.
+        """
+        return await asyncio.to_thread(self.generate, payload)
+
+    def close(self):
+        """Closes all pooled connections."""
+        self.session.close()
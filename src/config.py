@@ -14,8 +14,13 @@ import os
 #     # "model": "gemini-2.5-flash-lite",
 #     # "api_key_env": "GEMINI_API_KEY", # Environment variable for the API key
 #     # "api_base": None, # Not needed for Google
-#     # "api_sleep_time": 4, # Seconds to wait after this player's turn
+#     # "requests_per_minute": 15, # Provider quota; calls wait only when it is exhausted
+#     # "tokens_per_minute": 250000, # Optional token quota (prompt + answer)
 #     # "temperature": 1.0,
+#     # "density_hint": False, # Add the probability-density engine's top cells to the prompt
+#     # "board_format": "rows", # Board encoding in the prompt: 'json', 'rows', 'rle' or 'shots'
+#     # "prompt_token_budget": 400, # Approximate max prompt tokens; the prompt is compacted to fit
+#     # "candidate_shots": 3, # Ask for this many ranked shots per call and take the first legal one
 # }
 
 PLAYER1_CONFIG = {
@@ -24,8 +29,14 @@ PLAYER1_CONFIG = {
     "model": "gemma3:1b", # The model name as defined in Ollama
     "api_key_env": None, # Not needed for local Ollamaoll
     "api_base": "http://localhost:11434/api/generate", # Ollama's API endpoint
-    "api_sleep_time": 0, # Local models are fast, so no sleep time is needed
+    "requests_per_minute": None, # Local models have no quota
+    "tokens_per_minute": None,
     "temperature": 0.8,
+    "density_hint": False, # Add the probability-density engine's top cells to the prompt
+    "board_format": "json", # Board encoding in the prompt: 'json', 'rows', 'rle' or 'shots'
+    "prompt_token_budget": None, # Approximate max prompt tokens; the prompt is compacted to fit
+    "candidate_shots": 1, # Ask for this many ranked shots per call and take the first legal one
+    "session_mode": False, # Ollama only: keep one /api/chat conversation per game and send per-turn deltas
 }
 
 # --- Player 2 Configuration ---
@@ -36,8 +47,14 @@ PLAYER2_CONFIG = {
     "model": "gemma3:1b", # The model name as defined in Ollama
     "api_key_env": None, # Not needed for local Ollamaoll
     "api_base": "http://localhost:11434/api/generate", # Ollama's API endpoint
-    "api_sleep_time": 0, # Local models are fast, so no sleep time is needed
+    "requests_per_minute": None, # Local models have no quota
+    "tokens_per_minute": None,
     "temperature": 0.8,
+    "density_hint": False, # Add the probability-density engine's top cells to the prompt
+    "board_format": "json", # Board encoding in the prompt: 'json', 'rows', 'rle' or 'shots'
+    "prompt_token_budget": None, # Approximate max prompt tokens; the prompt is compacted to fit
+    "candidate_shots": 1, # Ask for this many ranked shots per call and take the first legal one
+    "session_mode": False, # Ollama only: keep one /api/chat conversation per game and send per-turn deltas
 }
 
 
@@ -51,10 +68,76 @@ SHIPS_CONFIG = [
     {"name": "Submarine", "length": 3},
     {"name": "Destroyer", "length": 2},
 ]
+# Base seed for fleet layouts. With a fixed value, game N of every tournament gets the same
+# boards, so different models can be compared on paired layouts. None draws a random seed per game.
+BASE_SEED = None
+
+# --- Tournaments ---
+# Players of a multi-player tournament (tournament.py). Each entry is a player configuration
+# like PLAYER1_CONFIG; names must be distinct.
+TOURNAMENT_PLAYERS = [PLAYER1_CONFIG, PLAYER2_CONFIG]
+TOURNAMENT_FORMAT = "round_robin" # 'round_robin' or 'swiss'
+GAMES_PER_PAIRING = 2 # Games per pairing (per round for Swiss); players alternate moving first
+TOURNAMENT_ROUNDS = None # Swiss rounds; None uses ceil(log2(players))
+TOURNAMENT_WORKERS = 2 # Worker processes draining the job queue; each runs MAX_CONCURRENT_GAMES games
+TOURNAMENT_MAX_ATTEMPTS = 3 # A job that keeps failing is marked 'failed' after this many attempts
+
+# --- Concurrency ---
+MAX_CONCURRENT_GAMES = 4 # Number of games kept in flight at once
+PROVIDER_CONCURRENCY = {
+    "google": 2, # Max simultaneous requests to the Gemini API
+    "ollama": 4, # Should match OLLAMA_NUM_PARALLEL on the Ollama server
+}
+
+# --- Batch Inference ---
+# Providers listed here send their moves through a batching stage (see batching.py) that collects
+# the pending moves of concurrent games and dispatches them together. Each game has at most one
+# move pending, so batches are bounded by MAX_CONCURRENT_GAMES.
+BATCH_PROVIDERS = () # e.g. ("google", "ollama")
+BATCH_MAX_SIZE = 8 # Most moves dispatched in one batch
+BATCH_MAX_WAIT = 0.05 # Seconds a batch waits for more moves after its first one arrives
 
 # --- Database ---
 DB_FILE = "battleship.db"
+DB_BUSY_TIMEOUT = 30 # Seconds a write waits for another process's transaction (tournament workers share the file)
+DB_BATCH_SIZE = 200 # Buffered turns are written once this many are pending
+DB_FLUSH_INTERVAL = 5.0 # Seconds between background flushes of buffered turns (0 disables the timer); also how far the Live view can lag behind a game
+ANALYTICS_DIR = "analytics" # Columnar export of finished games for offline analysis (see analytics.py)
 
 # --- LLM Settings ---
-LLM_REQUEST_TIMEOUT = 60 # Increased timeout for potentially slower local models
+LLM_REQUEST_TIMEOUT = 60 # Read timeout; increased for potentially slower local models
+LLM_CONNECT_TIMEOUT = 5 # Seconds to wait for a TCP connection to the provider
+OLLAMA_POOL_SIZE = 8 # Keep-alive connections kept per Ollama player; should be >= PROVIDER_CONCURRENCY["ollama"]
+OLLAMA_KEEP_ALIVE = "30m" # How long Ollama keeps the model (and its prompt cache) loaded between requests
+SESSION_MAX_TURNS = 30 # Chat sessions restart from a full snapshot after this many turns, to stay within the context window
 LLM_RETRY_ATTEMPTS = 3
+DENSITY_HINT_CELLS = 5 # Number of cells listed when a player has "density_hint" enabled
+STRUCTURED_OUTPUT = True # Constrain answers with a JSON schema (Ollama `format`, Gemini `response_schema`); needs Ollama >= 0.5
+
+# --- Logging and Console ---
+# Log records are queued and written by a background thread (see logs.py), so logging never
+# blocks a game's turn. Prompt and answer bodies are the bulk of the log; sample them in large runs.
+LOG_FILE = "all_logs.log"
+LOG_LEVEL = "INFO" # 'DEBUG' adds the raw provider payloads, 'WARNING' keeps only problems
+LOG_BODY_SAMPLE_RATE = 1.0 # Fraction of attempts whose prompt and answer are logged (0 disables them)
+LOG_MAX_BYTES = 0 # Rotate the log file at this size in bytes (0 = one file per run)
+LOG_BACKUP_COUNT = 5 # Rotated files kept
+LOG_COMPRESS = True # gzip rotated log files
+CONSOLE_MODE = "verbose" # 'verbose' prints every turn, 'progress' shows a progress bar, 'quiet' prints only summaries
+
+# --- Rate Limiting ---
+# Quotas are set per player with "requests_per_minute" / "tokens_per_minute"; players sharing a
+# provider account share the quota. Rate limits (429) and server errors (5xx) are retried with
+# exponential backoff and full jitter.
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+PROVIDER_RETRY_DEADLINE = 300 # Seconds one move keeps retrying such errors (apart from LLM_RETRY_ATTEMPTS) before its game is abandoned
+
+# --- Response Cache ---
+# When enabled, identical decision states (same provider, model, temperature and prompt) reuse
+# the previously parsed move instead of calling the model. Games played with the cache enabled
+# are flagged in the games table and excluded from the summary by default.
+RESPONSE_CACHE_ENABLED = False
+RESPONSE_CACHE_FILE = "response_cache.db"
+RESPONSE_CACHE_MAX_ENTRIES = 100000 # Least recently used entries are evicted beyond this
+RESPONSE_CACHE_TTL = 7 * 24 * 3600 # Seconds before an entry expires (0 = never)
@@ -1,10 +1,139 @@
+import os
 import sqlite3
 import json
-from . import config
+import atexit
+import logging
+import threading
+from . import config, stats
+
+logger = logging.getLogger(__name__)
+
+# Per-turn timing and usage of LLM moves, in move_metrics column order (see llm.get_llm_move).
+METRICS_COLUMNS = (
+    "game_id", "turn", "player_name", "provider", "model", "latency_ms", "attempts",
+    "prompt_tokens", "completion_tokens", "provider_duration_ms", "cached", "random_fallback",
+)
+
+# Tables whose changes are counted in table_versions (the tables served by /api/raw).
+VERSIONED_TABLES = ("games", "boards", "moves")
+
+
+class DatabaseWriter:
+    """
+    Owns a single long-lived SQLite connection in WAL mode. Turn records are buffered
+    and written in batched transactions: when DB_BATCH_SIZE turns are pending, every
+    DB_FLUSH_INTERVAL seconds, when a game ends, and on shutdown.
+    """
+    def __init__(self, db_file, batch_size=None, flush_interval=None):
+        self.batch_size = config.DB_BATCH_SIZE if batch_size is None else batch_size
+        self.flush_interval = config.DB_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.conn = sqlite3.connect(db_file, check_same_thread=False, timeout=config.DB_BUSY_TIMEOUT)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # WAL only needs to fsync at checkpoints; a power loss can drop the last commits but not corrupt the file.
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.lock = threading.RLock()
+        self.pending_turns = []
+        self.pending_metrics = []
+        self._closed = threading.Event()
+        self._flusher = None
+        if self.flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_periodically, name="db-flusher", daemon=True)
+            self._flusher.start()
+
+    def _flush_periodically(self):
+        """Background loop that flushes buffered turns on a timer."""
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Periodic database flush failed: {e}")
+
+    def add_turn(self, row, metrics_row=None):
+        """Buffers a turn record (and its move_metrics row, if any), flushing once the batch is full."""
+        with self.lock:
+            self.pending_turns.append(row)
+            if metrics_row is not None:
+                self.pending_metrics.append(metrics_row)
+            if len(self.pending_turns) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        """Writes all buffered turn records in a single transaction."""
+        with self.lock:
+            if not self.pending_turns:
+                return
+            with self.conn:
+                self.conn.executemany(
+                    """
+                    INSERT INTO moves (game_id, turn, player_name, shot_row, shot_col, result, invalid_attempts, random_fallback)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    self.pending_turns
+                )
+                if self.pending_metrics:
+                    self.conn.executemany(
+                        f"INSERT INTO move_metrics ({', '.join(METRICS_COLUMNS)}) VALUES ({', '.join('?' * len(METRICS_COLUMNS))})",
+                        self.pending_metrics
+                    )
+            self.pending_turns = []
+            self.pending_metrics = []
+
+    def execute(self, query, args=()):
+        """Runs a single statement in its own transaction and returns the cursor's lastrowid."""
+        with self.lock, self.conn:
+            cursor = self.conn.execute(query, args)
+        return cursor.lastrowid
+
+    def executemany(self, query, rows):
+        """Runs one statement for many rows in a single transaction."""
+        with self.lock, self.conn:
+            self.conn.executemany(query, rows)
+
+    def close(self):
+        """Stops the flush timer, writes any buffered turns and closes the connection."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self.lock:
+            self.flush()
+            self.conn.close()
+
+
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+def get_writer():
+    """Returns the process-wide database writer, creating it on first use (and again in a forked child)."""
+    global _writer, _writer_pid
+    with _writer_lock:
+        if _writer is None or _writer_pid != os.getpid():
+            # A connection inherited through fork must not be used by the child.
+            _writer = DatabaseWriter(config.DB_FILE)
+            _writer_pid = os.getpid()
+        return _writer
+
+def flush():
+    """Forces all buffered turn records to be written."""
+    if _writer is not None:
+        _writer.flush()
+
+@atexit.register
+def close():
+    """Flushes buffered writes and closes the connection. Runs automatically at exit."""
+    global _writer
+    with _writer_lock:
+        if _writer is not None and _writer_pid == os.getpid():
+            _writer.close()
+        _writer = None
 
 def init_db():
     """Initializes the SQLite database and creates tables if they don't exist."""
     conn = sqlite3.connect(config.DB_FILE)
+    # WAL lets api.py keep reading while the simulation writes.
+    conn.execute("PRAGMA journal_mode=WAL")
     cursor = conn.cursor()
     
     # Games table: Stores overall information for each game
@@ -16,7 +145,11 @@ def init_db():
         start_time DATETIME DEFAULT CURRENT_TIMESTAMP,
         end_time DATETIME,
         player1_name TEXT,
-        player2_name TEXT
+        player2_name TEXT,
+        settings TEXT,
+        response_cache INTEGER DEFAULT 0,
+        seed INTEGER,
+        job_id INTEGER
     )
     """)
     
@@ -27,6 +160,19 @@ def init_db():
     except sqlite3.OperationalError:
         # Columns likely already exist
         pass
+    try:
+        cursor.execute("ALTER TABLE games ADD COLUMN settings TEXT")
+    except sqlite3.OperationalError:
+        pass
+    try:
+        cursor.execute("ALTER TABLE games ADD COLUMN response_cache INTEGER DEFAULT 0")
+    except sqlite3.OperationalError:
+        pass
+    for column in ("seed", "job_id"):
+        try:
+            cursor.execute(f"ALTER TABLE games ADD COLUMN {column} INTEGER")
+        except sqlite3.OperationalError:
+            pass
     
     # Boards table: Stores the initial ship placements for each player in a game
     cursor.execute("""
@@ -39,7 +185,8 @@ def init_db():
     )
     """)
     
-    # Moves table: Records every single move made in every game
+    # Moves table: Records every single move made in every game.
+    # board_state_llm1/2 are legacy columns; new rows leave them NULL (see _migrate).
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS moves (
         move_id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -52,69 +199,180 @@ def init_db():
         board_state_llm1 TEXT,
         board_state_llm2 TEXT,
         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        invalid_attempts INTEGER DEFAULT 0,
+        random_fallback INTEGER DEFAULT 0,
+        FOREIGN KEY (game_id) REFERENCES games (game_id)
+    )
+    """)
+    
+    for column in ("invalid_attempts", "random_fallback"):
+        try:
+            cursor.execute(f"ALTER TABLE moves ADD COLUMN {column} INTEGER DEFAULT 0")
+        except sqlite3.OperationalError:
+            pass
+
+    # Move metrics table: timing and token usage of every LLM move, one row per turn
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS move_metrics (
+        game_id INTEGER,
+        turn INTEGER,
+        player_name TEXT,
+        provider TEXT,
+        model TEXT,
+        latency_ms REAL,
+        attempts INTEGER,
+        prompt_tokens INTEGER,
+        completion_tokens INTEGER,
+        provider_duration_ms REAL,
+        cached INTEGER DEFAULT 0,
+        random_fallback INTEGER DEFAULT 0,
+        PRIMARY KEY (game_id, turn),
         FOREIGN KEY (game_id) REFERENCES games (game_id)
     )
     """)
+
+    # Jobs table: the persistent work queue of multi-player tournaments (see tournament.py)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS jobs (
+        job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tournament TEXT NOT NULL,
+        round INTEGER NOT NULL,
+        slot INTEGER NOT NULL,
+        player1_name TEXT,
+        player2_name TEXT,
+        seed INTEGER,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        worker TEXT,
+        game_id INTEGER,
+        error TEXT,
+        claimed_at DATETIME,
+        finished_at DATETIME,
+        UNIQUE (tournament, round, slot)
+    )
+    """)
+
+    # Aggregate tables maintained incrementally (see stats.py)
+    stats.create_tables(cursor)
+
+    # Change counters of the exported tables, bumped by triggers on every insert, update and
+    # delete, whichever process writes. /api/raw derives its ETags from them.
+    cursor.execute("CREATE TABLE IF NOT EXISTS table_versions (table_name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)")
+    for table in VERSIONED_TABLES:
+        cursor.execute("INSERT OR IGNORE INTO table_versions (table_name) VALUES (?)", (table,))
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_version AFTER {event} ON {table} "
+                f"BEGIN UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}'; END"
+            )
+
+    # Indexes for the read paths in api.py
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_moves_game_turn ON moves (game_id, turn)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_boards_game ON boards (game_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_games_winner ON games (winner)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_games_player1 ON games (player1_name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_games_player2 ON games (player2_name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_games_start_time ON games (start_time)")
+    # Sorted latencies per player and model, so /api/metrics reads its percentiles without sorting.
+    # It also serves lookups by player_name, which replaced the older single-column index.
+    cursor.execute("DROP INDEX IF EXISTS idx_move_metrics_player")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_move_metrics_latency ON move_metrics (player_name, provider, model, latency_ms)"
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (tournament, status)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_games_job ON games (job_id)")
     
     conn.commit()
+    migrated = _migrate(conn)
+    if migrated:
+        # Give the space freed by the migration back to the filesystem.
+        conn.execute("VACUUM")
     conn.close()
     print("Database initialized.")
 
+SCHEMA_VERSION = 4
+
+def _migrate(conn):
+    """Upgrades an existing database to SCHEMA_VERSION. Returns True if anything changed."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return False
+    with conn:
+        if version < 1:
+            # Version 1: moves keep only the shot and result. The per-turn JSON board
+            # snapshots are fully determined by the shots, so they are dropped.
+            cursor = conn.execute(
+                "UPDATE moves SET board_state_llm1 = NULL, board_state_llm2 = NULL "
+                "WHERE board_state_llm1 IS NOT NULL OR board_state_llm2 IS NOT NULL"
+            )
+            if cursor.rowcount:
+                print(f"Migrated {cursor.rowcount} moves to compact storage.")
+        if version < 2:
+            # Version 2: materialized per-player statistics, filled once from the existing rows.
+            stats.backfill(conn)
+        elif version < 4:
+            # Version 3: player statistics leave out games played with the response cache.
+            # Version 4: shots count only once their game finishes, so abandoned games are dropped.
+            stats.backfill(conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return True
+
 def save_initial_boards(game_id, players):
     """Saves the starting board layouts to the database."""
-    conn = sqlite3.connect(config.DB_FILE)
-    cursor = conn.cursor()
-    for name, data in players.items():
-        cursor.execute(
-            "INSERT INTO boards (game_id, player_name, ship_placements) VALUES (?, ?, ?)",
-            (game_id, name, json.dumps(data["board"]))
-        )
-    conn.commit()
-    conn.close()
-
-def record_turn(game_id, turn_number, player_name, shot, result, board_views):
-    """Records the game state for the current turn into the database."""
-    conn = sqlite3.connect(config.DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        INSERT INTO moves (game_id, turn, player_name, shot_row, shot_col, result, board_state_llm1, board_state_llm2)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            game_id,
-            turn_number,
-            player_name,
-            shot[0],
-            shot[1],
-            result,
-            json.dumps(board_views["LLM_1"]),
-            json.dumps(board_views["LLM_2"]),
-        )
+    get_writer().executemany(
+        "INSERT INTO boards (game_id, player_name, ship_placements) VALUES (?, ?, ?)",
+        [(game_id, name, json.dumps(data["board"].to_grid())) for name, data in players.items()]
     )
-    conn.commit()
-    conn.close()
 
-def create_new_game(player1_name, player2_name):
-    """Creates a new game entry in the DB and returns the game_id."""
-    conn = sqlite3.connect(config.DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO games (player1_name, player2_name, turns) VALUES (?, ?, 0)",
-        (player1_name, player2_name)
+def record_turn(game_id, turn_number, player_name, shot, result, move_info=None):
+    """
+    Buffers the shot and result for the current turn; it is written in the next batch.
+    Board snapshots are not stored: they are rebuilt from the shots when read.
+    `move_info` carries how the move was chosen (invalid_attempts, random_fallback). LLM moves
+    also carry timing and token usage, which go to the move_metrics table.
+    """
+    move_info = move_info or {}
+    metrics_row = None
+    if "latency_ms" in move_info:
+        metrics_row = (game_id, turn_number, player_name) + tuple(
+            move_info.get(column) for column in METRICS_COLUMNS[3:-2]
+        ) + (int(move_info.get("cached", False)), int(move_info.get("random_fallback", False)))
+    get_writer().add_turn((
+        game_id,
+        turn_number,
+        player_name,
+        shot[0],
+        shot[1],
+        result,
+        move_info.get("invalid_attempts", 0),
+        int(move_info.get("random_fallback", False)),
+    ), metrics_row)
+
+def create_new_game(player1_name, player2_name, settings=None, response_cache=False, seed=None, job_id=None):
+    """
+    Creates a new game entry in the DB and returns the game_id.
+    `settings` records the per-player options the game was played with (model, prompt hints, ...).
+    `response_cache` flags games whose moves may have come from the response cache.
+    `seed` is the game's layout seed, which replay.py uses to rebuild its state.
+    `job_id` links the game to the tournament job that played it.
+    """
+    return get_writer().execute(
+        "INSERT INTO games (player1_name, player2_name, turns, settings, response_cache, seed, job_id) VALUES (?, ?, 0, ?, ?, ?, ?)",
+        (player1_name, player2_name, json.dumps(settings) if settings is not None else None, int(response_cache), seed, job_id)
     )
-    game_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return game_id
 
 def update_game_winner(game_id, winner, turns):
-    """Updates the game record with the winner and final turn count."""
-    conn = sqlite3.connect(config.DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE games SET winner = ?, turns = ?, end_time = CURRENT_TIMESTAMP WHERE game_id = ?",
-        (winner, turns, game_id)
-    )
-    conn.commit()
-    conn.close()
+    """
+    Flushes the game's buffered turns, updates the game record with the winner and final
+    turn count, and adds the result and the game's turns to the player statistics in the same
+    transaction.
+    """
+    writer = get_writer()
+    with writer.lock:
+        writer.flush()
+        with writer.conn:
+            writer.conn.execute(
+                "UPDATE games SET winner = ?, turns = ?, end_time = CURRENT_TIMESTAMP WHERE game_id = ?",
+                (winner, turns, game_id)
+            )
+            stats.apply_game_result(writer.conn, game_id, winner, turns)
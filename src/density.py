@@ -0,0 +1,75 @@
+import numpy as np
+
+# How much more a placement counts for each unresolved hit it passes through.
+HIT_WEIGHT = 20
+
+
+def heatmap(opponent_view, remaining_lengths, unresolved_hits=None):
+    """
+    Returns an (N, N) array counting, for every cell, the placements of the remaining
+    enemy ships that cover it, given a view from BattleshipGame.get_opponent_view.
+    Already-targeted cells score 0.
+    """
+    view = np.asarray(opponent_view)
+    return heatmap_from_masks(view == "H", view == "M", remaining_lengths, unresolved_hits)
+
+
+def heatmap_from_masks(hits, misses, remaining_lengths, unresolved_hits=None):
+    """
+    Same as heatmap(), from boolean (N, N) arrays of hit and missed cells.
+    If unresolved_hits is given, placements through hits are only favoured while it is positive.
+    """
+    targeting = bool(hits.any()) if unresolved_hits is None else unresolved_hits > 0
+    length_counts = {}
+    for length in remaining_lengths:
+        length_counts[length] = length_counts.get(length, 0) + 1
+    scores = _row_coverage(hits, misses, length_counts, targeting)
+    scores += _row_coverage(hits.T, misses.T, length_counts, targeting).T
+    scores[hits | misses] = 0
+    return scores
+
+
+def _row_coverage(hits, misses, length_counts, targeting):
+    """Counts weighted horizontal placements of the remaining ships covering each cell."""
+    n_rows, n_cols = hits.shape
+    miss_sums = _prefix_sums(misses)
+    hit_sums = _prefix_sums(hits) if targeting else None
+    coverage = np.zeros((n_rows, n_cols), dtype=np.int64)
+    for length, count in length_counts.items():
+        if length > n_cols:
+            continue
+        starts = n_cols - length + 1
+        # Window sums over every placement start: prefix[start + length] - prefix[start].
+        weights = (miss_sums[:, length:] == miss_sums[:, :starts]).astype(np.int64)
+        if targeting:
+            weights *= 1 + HIT_WEIGHT * (hit_sums[:, length:] - hit_sums[:, :starts])
+        if count != 1:
+            weights *= count
+        for offset in range(length):
+            coverage[:, offset:offset + starts] += weights
+    return coverage
+
+
+def _prefix_sums(grid):
+    """Returns row-wise prefix sums with a leading zero column, shape (rows, cols + 1)."""
+    prefix = np.zeros((grid.shape[0], grid.shape[1] + 1), dtype=np.int64)
+    np.cumsum(grid, axis=1, out=prefix[:, 1:])
+    return prefix
+
+
+def top_cells(scores, count=5):
+    """Returns the `count` highest-scoring cells as (row, col) tuples, best first."""
+    flat = scores.ravel()
+    count = min(count, int(np.count_nonzero(flat))) or 1
+    best = np.argpartition(-flat, count - 1)[:count]
+    best = best[np.argsort(-flat[best], kind="stable")]
+    n_cols = scores.shape[1]
+    return [(int(i) // n_cols, int(i) % n_cols) for i in best]
+
+
+def best_shot(scores, rng):
+    """Returns a random cell among the highest-scoring ones."""
+    flat = scores.ravel()
+    candidates = np.flatnonzero(flat == flat.max())
+    idx = int(candidates[rng.randrange(len(candidates))])
+    return divmod(idx, scores.shape[1])
@@ -1,25 +1,45 @@
-import random
-import json
 from . import config
 from . import database
+from . import layouts
+from .board import Board
+
+class ShipStatus(dict):
+    """The public status of one ship. Read-only: process_shot replaces it instead of changing it."""
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("ShipStatus is read-only")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _read_only
+
 
 class BattleshipGame:
-    """Manages the state and logic of a single game of Battleship."""
-    def __init__(self, game_id, player1_name="LLM_1", player2_name="LLM_2"):
+    """
+    Manages the state and logic of a single game of Battleship. Fleet layouts come from
+    per-player RNG streams derived from `seed`, so a game with the same seed always starts
+    from the same boards. A random seed is drawn when none is given.
+    """
+    def __init__(self, game_id, player1_name="LLM_1", player2_name="LLM_2", record=True, seed=None):
         self.game_id = game_id
+        self.record = record # Headless simulations skip all database writes
+        self.seed = layouts.new_seed() if seed is None else seed
         self.players = {
-            player1_name: {"board": self._create_board(), "ships": self._create_ships()},
-            player2_name: {"board": self._create_board(), "ships": self._create_ships()},
+            player1_name: self._create_player_data(),
+            player2_name: self._create_player_data(),
         }
         self.player_names = [player1_name, player2_name]
         self.turn = 0
         self.winner = None
-        self._place_all_ships_randomly()
-        database.save_initial_boards(self.game_id, self.players)
+        self._place_all_ships()
+        if self.record:
+            database.save_initial_boards(self.game_id, self.players)
+
+    def _create_player_data(self):
+        """Creates a player's board, fleet and the public status of that fleet."""
+        ships = self._create_ships()
+        return {"board": self._create_board(), "ships": ships, "fleet_status": self._create_fleet_status(ships), "sunk_count": 0}
 
     def _create_board(self):
         """Creates an empty board."""
-        return [["W" for _ in range(config.GRID_SIZE)] for _ in range(config.GRID_SIZE)]
+        return Board(config.GRID_SIZE)
 
     def _create_ships(self):
         """Creates a deep copy of the ship configuration for a player."""
@@ -28,95 +48,92 @@ class BattleshipGame:
             for ship in config.SHIPS_CONFIG
         ]
 
-    def _place_all_ships_randomly(self):
-        """Randomly places all ships for both players."""
-        for player_data in self.players.values():
-            for ship in player_data["ships"]:
-                self._place_single_ship(player_data["board"], ship)
-
-    def _place_single_ship(self, board, ship):
-        """Places one ship on the board, ensuring no collisions."""
-        placed = False
-        while not placed:
-            horizontal = random.choice([True, False])
-            row = random.randint(0, config.GRID_SIZE - 1)
-            col = random.randint(0, config.GRID_SIZE - 1)
-            if self._can_place(board, ship["length"], row, col, horizontal):
-                for i in range(ship["length"]):
-                    if horizontal:
-                        board[row][col + i] = "S"
-                        ship["positions"].append((row, col + i))
-                    else:
-                        board[row + i][col] = "S"
-                        ship["positions"].append((row + i, col))
-                placed = True
-
-    def _can_place(self, board, length, row, col, horizontal):
-        """Checks if a ship can be placed at a given location."""
-        if horizontal:
-            if col + length > config.GRID_SIZE: return False
-            return all(board[row][col + i] == "W" for i in range(length))
-        else:
-            if row + length > config.GRID_SIZE: return False
-            return all(board[row + i][col] == "W" for i in range(length))
+    def _create_fleet_status(self, ships):
+        """Creates the public part of each ship (no positions), replaced by process_shot as ships are hit."""
+        return tuple(self._ship_status(s) for s in ships)
 
-    def get_opponent_view(self, player_name):
-        """Returns the opponent's board as seen by the player (no ships visible)."""
-        opponent_name = self.player_names[1] if player_name == self.player_names[0] else self.player_names[0]
-        opponent_board = self.players[opponent_name]["board"]
-        return [
-            [cell if cell in ["H", "M"] else "W" for cell in row]
-            for row in opponent_board
-        ]
+    def _ship_status(self, ship):
+        return ShipStatus(name=ship["name"], length=ship["length"], hits=ship["hits"], sunk=ship["sunk"])
 
-    def process_shot(self, player_name, row, col):
-        """Processes a shot, updates the board, and returns the result."""
-        opponent_name = self.player_names[1] if player_name == self.player_names[0] else self.player_names[0]
-        opponent_data = self.players[opponent_name]
-        target_cell = opponent_data["board"][row][col]
-        result = ""
+    def _place_all_ships(self):
+        """Places both fleets from the game's seeded layout streams."""
+        for seat, player_data in enumerate(self.players.values()):
+            layout = layouts.random_layout(layouts.player_rng(self.seed, seat), config.GRID_SIZE)
+            for ship_index, (ship, mask) in enumerate(zip(player_data["ships"], layout)):
+                ship["positions"] = player_data["board"].place(ship_index, mask)
 
-        if target_cell == "S":
-            opponent_data["board"][row][col] = "H"
-            result = "HIT"
-            for ship in opponent_data["ships"]:
-                if (row, col) in ship["positions"]:
-                    ship["hits"] += 1
-                    if ship["hits"] == ship["length"]:
-                        ship["sunk"] = True
-                        result = f"SUNK {ship['name']}"
-                    break
-        elif target_cell == "W":
-            opponent_data["board"][row][col] = "M"
-            result = "MISS"
-        else: # Already shot here
+    def _opponent_of(self, player_name):
+        """Returns the name of the other player."""
+        return self.player_names[1] if player_name == self.player_names[0] else self.player_names[0]
+
+    def get_opponent_view(self, player_name, copy=False):
+        """
+        Returns the opponent's board as seen by the player (no ships visible), as an immutable
+        tuple of rows that is maintained incrementally; pass copy=True for mutable lists.
+        """
+        board = self.players[self._opponent_of(player_name)]["board"]
+        return board.view_grid() if copy else board.view_rows()
+
+    def get_target_board(self, player_name):
+        """
+        Returns the opponent's Board for fast algorithmic players. Callers must only
+        look at shot state (hits, misses, is_targeted), never at ship positions.
+        """
+        return self.players[self._opponent_of(player_name)]["board"]
+
+    def get_own_ships_status(self, player_name, copy=False):
+        """
+        Returns the public status of the player's own fleet as an immutable tuple of read-only
+        ShipStatus dicts; pass copy=True for a list of plain dicts.
+        """
+        fleet_status = self.players[player_name]["fleet_status"]
+        return [dict(s) for s in fleet_status] if copy else fleet_status
+
+    def remaining_ship_lengths(self, player_name):
+        """Returns the lengths of the enemy ships that are still afloat (sinkings are announced)."""
+        return [s["length"] for s in self.players[self._opponent_of(player_name)]["ships"] if not s["sunk"]]
+
+    def unresolved_hit_count(self, player_name):
+        """Returns how many of the player's hits do not yet belong to an announced sunk ship."""
+        opponent_data = self.players[self._opponent_of(player_name)]
+        sunk_cells = sum(s["length"] for s in opponent_data["ships"] if s["sunk"])
+        return bin(opponent_data["board"].hits).count("1") - sunk_cells
+
+    def process_shot(self, player_name, row, col, move_info=None):
+        """
+        Processes a shot, updates the board, and returns the result.
+        `move_info` describes how the move was chosen and is stored with the turn.
+        """
+        opponent_data = self.players[self._opponent_of(player_name)]
+        ship_index = opponent_data["board"].fire(row, col)
+
+        if ship_index is None: # Already shot here
             result = "DUPLICATE"
+        elif ship_index < 0:
+            result = "MISS"
+        else:
+            result = "HIT"
+            ship = opponent_data["ships"][ship_index]
+            ship["hits"] += 1
+            if ship["hits"] == ship["length"]:
+                ship["sunk"] = True
+                opponent_data["sunk_count"] += 1
+                result = f"SUNK {ship['name']}"
+            fleet_status = opponent_data["fleet_status"]
+            opponent_data["fleet_status"] = (
+                fleet_status[:ship_index] + (self._ship_status(ship),) + fleet_status[ship_index + 1:]
+            )
+
+        self._check_win_condition(player_name)
 
-        self._check_win_condition()
-        
         # Record the turn to the database
-        board_views = {
-            self.player_names[0]: self.get_opponent_view(self.player_names[0]),
-            self.player_names[1]: self.get_opponent_view(self.player_names[1]),
-        }
-        # The database schema has fixed column names, so we map our dynamic players to them.
-        database.record_turn(
-            self.game_id, 
-            self.turn, 
-            player_name, 
-            (row, col), 
-            result, 
-            {
-                "LLM_1": board_views[self.player_names[0]],
-                "LLM_2": board_views[self.player_names[1]],
-            }
-        )
-        
+        if self.record:
+            database.record_turn(self.game_id, self.turn, player_name, (row, col), result, move_info)
+
         return result
 
-    def _check_win_condition(self):
-        """Checks if a player has won the game."""
-        for name, data in self.players.items():
-            if all(ship["sunk"] for ship in data["ships"]):
-                self.winner = self.player_names[1] if name == self.player_names[0] else self.player_names[0]
-                break
+    def _check_win_condition(self, player_name):
+        """Checks whether the player who just fired has sunk the whole enemy fleet."""
+        opponent_data = self.players[self._opponent_of(player_name)]
+        if opponent_data["sunk_count"] == len(opponent_data["ships"]):
+            self.winner = player_name
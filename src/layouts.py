@@ -0,0 +1,68 @@
+import random
+from functools import lru_cache
+from . import config
+from .board import Board
+
+# Fleet layouts are drawn from precomputed placement tables. For each ship in turn, a
+# placement is picked uniformly among those that fit around the ships already placed: random
+# placements are redrawn while they overlap, and only after MAX_REJECTIONS misses (a crowded
+# board) are the free placements listed and one of them chosen. Both steps use only `rng`, so
+# seeded layouts stay reproducible.
+
+MAX_REJECTIONS = 50
+
+
+@lru_cache(maxsize=None)
+def placements(length, size):
+    """Returns every placement mask of a ship of `length` on an empty `size` x `size` board."""
+    board = Board(size)
+    masks = []
+    for horizontal in (True, False):
+        for row in range(size):
+            for col in range(size):
+                mask = board.placement_mask(length, row, col, horizontal)
+                if mask is not None:
+                    masks.append(mask)
+    return tuple(masks)
+
+
+def random_layout(rng, size=None, ships=None):
+    """
+    Returns one placement mask per ship of `ships` (default SHIPS_CONFIG), drawn with `rng`.
+    Raises ValueError if the fleet cannot fit on the board.
+    """
+    size = config.GRID_SIZE if size is None else size
+    ships = config.SHIPS_CONFIG if ships is None else ships
+    occupied = 0
+    layout = []
+    for ship in ships:
+        candidates = placements(ship["length"], size)
+        if not candidates:
+            raise ValueError(f"No room left for the {ship['name']} on a {size}x{size} board.")
+        for _ in range(MAX_REJECTIONS):
+            mask = rng.choice(candidates)
+            if not mask & occupied:
+                break
+        else:
+            free = [mask for mask in candidates if not mask & occupied]
+            if not free:
+                raise ValueError(f"No room left for the {ship['name']} on a {size}x{size} board.")
+            mask = rng.choice(free)
+        occupied |= mask
+        layout.append(mask)
+    return layout
+
+
+def new_seed(rng=random):
+    """Returns a fresh game seed that fits in a SQLite INTEGER column."""
+    return rng.randrange(2**63)
+
+
+def derive_seed(*parts):
+    """Derives a reproducible seed from a base seed and labels, e.g. derive_seed(base, game_number)."""
+    return new_seed(random.Random(":".join(str(part) for part in parts)))
+
+
+def player_rng(game_seed, seat):
+    """Returns the independent RNG stream a game uses for the fleet of the player in `seat` (0 or 1)."""
+    return random.Random(f"{game_seed}:layout:{seat}")
@@ -1,32 +1,57 @@
 import os
 import json
-import time
 import random
-import requests
+import time
 import logging
+import threading
+import contextlib
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
-from . import config
+from . import config, batching, cache, clients, logs, parsing, prompts, ratelimit
 
 # --- Logging Setup ---
-# The logger is now configured in main.py. We just get it here.
+# The logger is configured by logs.setup_logging. We just get it here.
 logger = logging.getLogger(__name__)
 
 # --- Model Management ---
 initialized_models = {}
 
-shot_schema = {
-    "type": "object",
-    "properties": {
-        "row": {"type": "integer", "description": "The row to target (0-9)."},
-        "col": {"type": "integer", "description": "The column to target (0-9)."},
-    },
-    "required": ["row", "col"],
-}
-
-def initialize_models():
-    """Initializes the generative models based on the player configurations."""
-    player_configs = [config.PLAYER1_CONFIG, config.PLAYER2_CONFIG]
+# Limits the number of in-flight requests per provider when several games run concurrently.
+provider_slots = {}
+
+# Batching stages for the providers in BATCH_PROVIDERS, created in initialize_models.
+batchers = {}
+
+# Content-addressed cache of parsed moves, created in initialize_models when enabled.
+response_cache = None
+
+# Rough size of a move answer, charged against tokens-per-minute quotas with the prompt.
+COMPLETION_TOKEN_ESTIMATE = 20
+
+# Per-player prompt size statistics, reported at the end of a run (see prompt_size_report).
+prompt_stats = {}
+_prompt_stats_lock = threading.Lock()
+
+def initialize_models(player_configs=None):
+    """Initializes the generative models for `player_configs` (default: PLAYER1_CONFIG and PLAYER2_CONFIG)."""
+    global response_cache
+    if config.RESPONSE_CACHE_ENABLED and response_cache is None:
+        response_cache = cache.ResponseCache()
+        logger.warning("Response cache is ENABLED: repeated decision states will reuse earlier answers.")
+    if player_configs is None:
+        player_configs = [config.PLAYER1_CONFIG, config.PLAYER2_CONFIG]
+    for provider, limit in config.PROVIDER_CONCURRENCY.items():
+        provider_slots.setdefault(provider, threading.BoundedSemaphore(limit))
+    for provider in config.BATCH_PROVIDERS:
+        if provider not in batchers:
+            batchers[provider] = batching.MoveBatcher(
+                provider,
+                batching.concurrent_handler(lambda request: _call_provider(*request), config.BATCH_MAX_SIZE),
+                config.BATCH_MAX_SIZE,
+                config.BATCH_MAX_WAIT,
+            )
+            logger.info(f"Batch inference enabled for '{provider}' (max {config.BATCH_MAX_SIZE} moves, {config.BATCH_MAX_WAIT}s wait).")
+
     for player_config in player_configs:
         player_name = player_config["name"]
         provider = player_config["provider"]
@@ -44,16 +69,32 @@ def initialize_models():
                     generation_config={
                         "response_mime_type": "application/json",
                         "temperature": player_config["temperature"],
+                        **({"response_schema": parsing.shot_schema(player_config.get("candidate_shots", 1))}
+                           if config.STRUCTURED_OUTPUT else {}),
                     },
                 )
-                initialized_models[player_name] = {"provider": "google", "instance": model}
+                initialized_models[player_name] = {
+                    "provider": "google",
+                    "instance": model,
+                    "config": player_config,
+                    "limiter": ratelimit.get_limiter(player_config),
+                }
                 logger.info(f"Successfully initialized Google model '{player_config['model']}' for player {player_name}.")
             except Exception as e:
                 logger.error(f"Failed to initialize Google model for {player_name}. Error: {e}. This player will use random moves.")
                 initialized_models[player_name] = {"provider": "random"}
 
+        elif provider == "bot":
+            # Baseline bots (see players.BOTS) choose their own moves and need no model.
+            logger.info(f"Player {player_name} is the '{player_config['strategy']}' baseline bot.")
+
         elif provider == "ollama":
-            initialized_models[player_name] = {"provider": "ollama", "config": player_config}
+            initialized_models[player_name] = {
+                "provider": "ollama",
+                "config": player_config,
+                "client": clients.OllamaClient(player_config["api_base"]),
+                "limiter": ratelimit.get_limiter(player_config),
+            }
             logger.info(f"Configured Ollama model '{player_config['model']}' for player {player_name}.")
         
         else:
@@ -61,67 +102,209 @@ def initialize_models():
             initialized_models[player_name] = {"provider": "random"}
 
 
-def get_llm_move(player_name, opponent_view, own_ships_status, past_moves):
+def get_llm_move(player_name, opponent_view, own_ships_status, past_moves, move_info=None, session=None):
     """
     Gets a valid move from the appropriate LLM, with a self-correcting retry strategy.
+    If `move_info` is given, it is filled with the number of invalid answers, whether the
+    move fell back to a random shot, and the move's timing and token usage: latency_ms,
+    attempts (provider calls), prompt_tokens, completion_tokens, provider_duration_ms and cached.
+    An Ollama player with a `session` (sessions.ChatSession) sends only this turn's changes
+    over /api/chat; after any failure the move is retried with the full prompt.
     """
+    move_info = {} if move_info is None else move_info
     model_info = initialized_models.get(player_name, {"provider": "random"})
+    player_config = model_info.get("config", {})
+    move_info.update(
+        invalid_attempts=0, random_fallback=False, cached=False, attempts=0,
+        prompt_tokens=None, completion_tokens=None, provider_duration_ms=None,
+        provider=model_info["provider"], model=player_config.get("model"),
+    )
+    started = time.perf_counter()
+    try:
+        return _choose_llm_move(player_name, model_info, opponent_view, own_ships_status, past_moves, move_info, session)
+    finally:
+        move_info["latency_ms"] = (time.perf_counter() - started) * 1000
+
+
+def _choose_llm_move(player_name, model_info, opponent_view, own_ships_status, past_moves, move_info, session=None):
+    """The retry loop of get_llm_move."""
     error_history = []
+    player_config = model_info.get("config", {})
+    hint = prompts.density_hint(opponent_view, past_moves) if player_config.get("density_hint") else ""
+    use_session = session is not None and model_info["provider"] == "ollama"
 
     for attempt in range(config.LLM_RETRY_ATTEMPTS):
-        error_context = ""
-        if error_history:
-            error_context = "\nIMPORTANT: You have made invalid moves. Please correct your strategy based on the following errors:\n"
-            for error in error_history:
-                error_context += f"- {error}\n"
-            error_context += "Choose a new, valid coordinate from the available 'W' cells."
-
-        prompt = f"""
-        You are a world-class Battleship player, {player_name}. It's your turn.
-        Your goal: Sink all enemy ships on the 10x10 grid.
-        Coordinates are (row, col), from (0, 0) to (9, 9).
-        'W' = Water (unknown), 'H' = Hit, 'M' = Miss.
-        {error_context}
-        Your Fleet Status: {json.dumps(own_ships_status, indent=2)}
-        Enemy Waters (Your View): {json.dumps(opponent_view, indent=2)}
-        Your Recent Moves (last 10): {json.dumps(past_moves[-10:], indent=2)}
-        Analyze the board. Think strategically. Provide your next shot as a JSON object with 'row' and 'col'.
-        Do not fire at a location you have already targeted ('H' or 'M').
-        """
-        logger.info(f"Attempt {attempt+1} for {player_name}. Prompt:\n{prompt}")
+        messages = None
+        if use_session:
+            messages = session.next_messages(opponent_view, own_ships_status, past_moves, hint)
+            # Only the newest message is new to the server; the rest is served from its prompt cache.
+            prompt = messages[-1]["content"]
+            prompt_tokens, board_format = prompts.estimate_tokens(prompt), "session"
+        else:
+            prompt, prompt_tokens, board_format = prompts.build_prompt_within_budget(
+                player_name,
+                opponent_view,
+                own_ships_status,
+                past_moves,
+                error_history,
+                hint,
+                board_format=player_config.get("board_format", "json"),
+                token_budget=player_config.get("prompt_token_budget"),
+                candidates=player_config.get("candidate_shots", 1),
+            )
+        _record_prompt_size(player_name, prompt, prompt_tokens)
+        logger.info(f"Prompt size for {player_name}: {len(prompt)} chars, ~{prompt_tokens} tokens (format: {board_format}).")
+        # Prompts and answers are only logged for a sample of attempts (LOG_BODY_SAMPLE_RATE).
+        log_body = logs.sample_body()
+        if log_body:
+            logger.info(f"Attempt {attempt+1} for {player_name}. Prompt:\n{prompt}")
+
+        cache_key = None
+        # Session answers depend on the whole conversation, so they are never cached.
+        if response_cache is not None and model_info["provider"] in ("google", "ollama") and messages is None:
+            cache_key = cache.ResponseCache.make_key(
+                model_info["provider"], player_config.get("model"), player_config.get("temperature"), prompt
+            )
+            cached_move = response_cache.get(cache_key)
+            if cached_move is not None:
+                row, col = cached_move
+                if 0 <= row < config.GRID_SIZE and 0 <= col < config.GRID_SIZE and opponent_view[row][col] == 'W':
+                    logs.console(f"{player_name} (Cached) chooses ({row}, {col}).")
+                    move_info["cached"] = True
+                    return row, col
 
         try:
-            if model_info["provider"] == "google":
-                move = _get_google_move(player_name, model_info["instance"], prompt)
-            elif model_info["provider"] == "ollama":
-                move = _get_ollama_move(player_name, model_info["config"], prompt)
-            else:
+            if model_info["provider"] not in ("google", "ollama"):
                 break
+            answer, usage = _call_with_backoff(player_name, model_info, prompt, prompt_tokens, messages, move_info)
+            if log_body:
+                logger.info(f"Raw {model_info['provider']} answer for {player_name}: {answer}")
+            # Usage accumulates over attempts, so rejected answers show up as wasted tokens.
+            for key, value in usage.items():
+                if value is not None:
+                    move_info[key] = (move_info[key] or 0) + value
 
-            row, col = move["row"], move["col"]
-            if not (0 <= row < config.GRID_SIZE and 0 <= col < config.GRID_SIZE):
-                error_history.append(f"Your choice ({row}, {col}) was out of bounds. The grid is {config.GRID_SIZE}x{config.GRID_SIZE}.")
-                logger.warning(f"Invalid move from {player_name}: out of bounds.")
-            elif opponent_view[row][col] != 'W':
-                error_history.append(f"Your choice ({row}, {col}) was invalid because that location has already been targeted (it is '{opponent_view[row][col]}').")
-                logger.warning(f"Invalid move from {player_name}: location already targeted.")
+            # Tolerant parsing: schema answers, JSON inside prose, or plain "row 3, col 5" text.
+            # With candidate_shots, the first legal shot of the ranked list is taken.
+            shots = parsing.extract_shots(answer)
+            move = parsing.first_legal(shots, opponent_view)
+            if move is None:
+                move_info["invalid_attempts"] += 1
+                if use_session:
+                    # The conversation led the model astray; retry with the full board.
+                    session.reset()
+                    use_session = False
+                if not shots:
+                    error_history.append("Your answer did not contain a coordinate. Reply with a JSON object with 'row' and 'col'.")
+                    logger.warning(f"Invalid move from {player_name}: no coordinates found.")
+                else:
+                    row, col = shots[0]
+                    if not (0 <= row < config.GRID_SIZE and 0 <= col < config.GRID_SIZE):
+                        error_history.append(f"Your choice ({row}, {col}) was out of bounds. The grid is {config.GRID_SIZE}x{config.GRID_SIZE}.")
+                        logger.warning(f"Invalid move from {player_name}: out of bounds.")
+                    else:
+                        error_history.append(f"Your choice ({row}, {col}) was invalid because that location has already been targeted (it is '{opponent_view[row][col]}').")
+                        logger.warning(f"Invalid move from {player_name}: location already targeted.")
             else:
+                row, col = move
                 # --- FIX: Restore the command-line log for a successful move ---
                 provider_name = model_info.get("provider", "Unknown").capitalize()
-                print(f"{player_name} ({provider_name}) chooses ({row}, {col}).")
+                logs.console(f"{player_name} ({provider_name}) chooses ({row}, {col}).")
+                if cache_key is not None:
+                    response_cache.put(cache_key, (row, col))
+                if use_session:
+                    session.record_answer(answer)
                 return row, col
 
         except Exception as e:
+            if ratelimit.is_retryable(e):
+                # The provider stayed unavailable past PROVIDER_RETRY_DEADLINE. A random move would be
+                # recorded as the model's turn, so the error ends the game instead.
+                raise
+            if use_session:
+                session.reset()
+                use_session = False
+            move_info["invalid_attempts"] += 1
             error_history.append(f"The model returned an invalid response. Error: {e}")
             logger.error(f"Error processing LLM response for {player_name} (attempt {attempt+1}): {e}")
-            time.sleep(2)
 
+    move_info["random_fallback"] = True
     return get_random_move(opponent_view, player_name)
 
 
-def _get_google_move(player_name, model, prompt):
-    """Makes a single API call to a Google (Gemini) model."""
-    full_prompt = [prompt, "Output JSON:", json.dumps(shot_schema, indent=2)]
+def _call_with_backoff(player_name, model_info, prompt, prompt_tokens, messages, move_info):
+    """
+    Sends one attempt to the provider and returns (answer_text, usage). Rate limits and server
+    errors are not the model's fault: they are retried with backoff on their own budget, separate
+    from LLM_RETRY_ATTEMPTS, and re-raised once PROVIDER_RETRY_DEADLINE has passed.
+    """
+    deadline = time.monotonic() + config.PROVIDER_RETRY_DEADLINE
+    retry = 0
+    while True:
+        # Waits only when the provider quota requires it; other games keep running meanwhile.
+        waited = model_info["limiter"].acquire(prompt_tokens + COMPLETION_TOKEN_ESTIMATE)
+        if waited > 0:
+            logger.info(f"Rate limiter held {player_name} for {waited:.2f}s.")
+        move_info["attempts"] += 1
+        try:
+            batcher = batchers.get(model_info["provider"])
+            if batcher is not None:
+                return batcher.submit((player_name, model_info, prompt, messages))
+            return _call_provider(player_name, model_info, prompt, messages)
+        except Exception as e:
+            if not ratelimit.is_retryable(e):
+                raise
+            delay = ratelimit.backoff_delay(retry, e)
+            if time.monotonic() + delay > deadline:
+                logger.error(f"Provider errors for {player_name} lasted over {config.PROVIDER_RETRY_DEADLINE}s: {e}")
+                raise
+            logger.warning(f"Provider error for {player_name} (retry {retry+1}): {e}. Backing off {delay:.1f}s.")
+            time.sleep(delay)
+            retry += 1
+
+
+def _record_prompt_size(player_name, prompt, prompt_tokens):
+    """Adds one prompt to the player's running size statistics."""
+    with _prompt_stats_lock:
+        stats = prompt_stats.setdefault(player_name, {"prompts": 0, "chars": 0, "tokens": 0, "max_tokens": 0})
+        stats["prompts"] += 1
+        stats["chars"] += len(prompt)
+        stats["tokens"] += prompt_tokens
+        stats["max_tokens"] = max(stats["max_tokens"], prompt_tokens)
+
+
+def prompt_size_report():
+    """Returns one summary line per player with the average and maximum prompt size."""
+    with _prompt_stats_lock:
+        return [
+            f"{name}: {stats['prompts']} prompts, avg {stats['chars'] / stats['prompts']:.0f} chars "
+            f"(~{stats['tokens'] / stats['prompts']:.0f} tokens), max ~{stats['max_tokens']} tokens"
+            for name, stats in prompt_stats.items()
+        ]
+
+
+def _call_provider(player_name, model_info, prompt, messages=None):
+    """
+    Makes one provider call within the provider's concurrency limit. Returns (answer_text, usage).
+    With `messages`, an Ollama player continues its chat session instead of sending `prompt`.
+    """
+    with provider_slots.get(model_info["provider"], contextlib.nullcontext()):
+        if model_info["provider"] == "google":
+            candidates = model_info["config"].get("candidate_shots", 1)
+            return _get_google_move(player_name, model_info["instance"], prompt, candidates)
+        if messages is not None:
+            return _get_ollama_chat_move(player_name, model_info["client"], model_info["config"], messages)
+        return _get_ollama_move(player_name, model_info["client"], model_info["config"], prompt)
+
+
+def batch_report():
+    """Returns one summary line per batching stage."""
+    return [batcher.report() for batcher in batchers.values()]
+
+
+def _get_google_move(player_name, model, prompt, candidates=1):
+    """Makes a single API call to a Google (Gemini) model. Returns (answer_text, usage)."""
+    full_prompt = [prompt, "Output JSON:", json.dumps(parsing.shot_schema(candidates), indent=2)]
     response = model.generate_content(
         full_prompt,
         safety_settings={
@@ -131,36 +314,67 @@ def _get_google_move(player_name, model, prompt):
             HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
         }
     )
-    logger.info(f"Raw Google response for {player_name}: {response.text}")
-    return json.loads(response.text)
+    usage_metadata = getattr(response, "usage_metadata", None)
+    usage = {
+        "prompt_tokens": getattr(usage_metadata, "prompt_token_count", None),
+        "completion_tokens": getattr(usage_metadata, "candidates_token_count", None),
+        "provider_duration_ms": None, # Gemini does not report server-side timing
+    }
+    return response.text, usage
+
 
+def _ollama_usage(response_data):
+    """Token counts and server-side duration reported by Ollama."""
+    total_duration = response_data.get("total_duration") # nanoseconds
+    return {
+        "prompt_tokens": response_data.get("prompt_eval_count"),
+        "completion_tokens": response_data.get("eval_count"),
+        "provider_duration_ms": total_duration / 1e6 if total_duration is not None else None,
+    }
 
-def _get_ollama_move(player_name, player_config, prompt):
-    """Makes a single API call to a local Ollama model."""
+
+def _get_ollama_move(player_name, client, player_config, prompt):
+    """Makes a single API call to a local Ollama model over the player's pooled client. Returns (answer_text, usage)."""
     payload = {
         "model": player_config["model"],
         "prompt": prompt,
-        "format": "json",
+        # A JSON schema constrains decoding to the answer's shape and coordinate range (Ollama >= 0.5).
+        "format": parsing.ollama_format(player_config.get("candidate_shots", 1)) if config.STRUCTURED_OUTPUT else "json",
         "stream": False,
+        "keep_alive": config.OLLAMA_KEEP_ALIVE,
         "options": {"temperature": player_config["temperature"]}
     }
-    response = requests.post(
-        player_config["api_base"],
-        json=payload,
-        timeout=config.LLM_REQUEST_TIMEOUT
-    )
-    response.raise_for_status()
-    response_data = response.json()
-    logger.info(f"Raw Ollama response for {player_name}: {response_data}")
-    return json.loads(response_data.get("response", "{}"))
+    response_data = client.generate(payload)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Raw Ollama response for {player_name}: {response_data}")
+    return response_data.get("response", ""), _ollama_usage(response_data)
+
+
+def _get_ollama_chat_move(player_name, client, player_config, messages):
+    """
+    Continues the player's chat session over /api/chat. Ollama reuses its cache for the unchanged
+    start of the conversation, so prompt_eval_count covers only the new messages. Returns (answer_text, usage).
+    """
+    payload = {
+        "model": player_config["model"],
+        "messages": messages,
+        "format": parsing.ollama_format(player_config.get("candidate_shots", 1)) if config.STRUCTURED_OUTPUT else "json",
+        "stream": False,
+        "keep_alive": config.OLLAMA_KEEP_ALIVE,
+        "options": {"temperature": player_config["temperature"]}
+    }
+    response_data = client.chat(payload)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Raw Ollama chat response for {player_name}: {response_data}")
+    return response_data.get("message", {}).get("content", ""), _ollama_usage(response_data)
 
 
 def get_random_move(opponent_view, player_name="Player"):
     """Generates a random valid move as a fallback."""
     logger.warning(f"Player {player_name} is making a random move after failing all retry attempts.")
-    print(f"Player {player_name} is making a random move.")
+    logs.console(f"Player {player_name} is making a random move.")
     while True:
-        row, col = random.randint(0, 9), random.randint(0, 9)
+        row, col = random.randrange(config.GRID_SIZE), random.randrange(config.GRID_SIZE)
         if opponent_view[row][col] == 'W':
-            print(f"{player_name} (Random) chooses ({row}, {col}).")
+            logs.console(f"{player_name} (Random) chooses ({row}, {col}).")
             return row, col
\ No newline at end of file
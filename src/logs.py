@@ -0,0 +1,136 @@
+import os
+import sys
+import gzip
+import queue
+import random
+import shutil
+import atexit
+import logging
+import threading
+import logging.handlers
+from . import config
+
+# Logging and console output for the game loop. Records are handed to a queue and written by a
+# background listener thread, so file I/O, formatting of the output line and log rotation stay
+# off the threads that play turns.
+
+_listener = None
+_queue_handler = None
+_sampler = random.Random()
+_console_lock = threading.Lock()
+
+
+# --- Logging Pipeline ---
+
+def setup_logging(log_file=None, level=None):
+    """
+    Routes all logging through a queue to a background thread writing `log_file`
+    (default LOG_FILE) at `level` (default LOG_LEVEL). With LOG_MAX_BYTES set, the file is
+    rotated at that size, keeping LOG_BACKUP_COUNT old files (gzip-compressed with LOG_COMPRESS).
+    """
+    global _listener, _queue_handler
+    shutdown_logging()
+    log_file = config.LOG_FILE if log_file is None else log_file
+    level = config.LOG_LEVEL if level is None else level
+
+    file_handler = _file_handler(log_file)
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    root_logger.addHandler(_queue_handler)
+    _listener = logging.handlers.QueueListener(log_queue, file_handler)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Writes out the queued records and stops the listener thread. Safe to call more than once."""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def _file_handler(log_file):
+    if not config.LOG_MAX_BYTES:
+        return logging.FileHandler(log_file)
+    handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=config.LOG_MAX_BYTES, backupCount=config.LOG_BACKUP_COUNT
+    )
+    if config.LOG_COMPRESS:
+        handler.namer = lambda name: name + ".gz"
+        handler.rotator = _gzip_rotator
+    return handler
+
+
+def _gzip_rotator(source, dest):
+    """Compresses the full log file into its backup name (runs on the listener thread)."""
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def worker_log_file(worker_name):
+    """Log file of a tournament worker process: LOG_FILE with the worker's name before the extension."""
+    stem, ext = os.path.splitext(config.LOG_FILE)
+    return f"{stem}.{worker_name}{ext}"
+
+
+def sample_body():
+    """Decides whether one prompt and its response are written to the log (LOG_BODY_SAMPLE_RATE)."""
+    rate = config.LOG_BODY_SAMPLE_RATE
+    return rate >= 1 or (rate > 0 and _sampler.random() < rate)
+
+
+# --- Console ---
+
+def console(message):
+    """Prints per-turn progress messages; only shown in the 'verbose' CONSOLE_MODE."""
+    if config.CONSOLE_MODE == "verbose":
+        print(message)
+
+
+class Progress:
+    """
+    A one-line progress bar on stderr for the 'progress' CONSOLE_MODE; does nothing otherwise.
+    `update` sets the number of finished items, `advance` adds to it. Thread-safe.
+    """
+    def __init__(self, total, unit="games", width=30):
+        self.total = total
+        self.unit = unit
+        self.width = width
+        self.done = 0
+        self.enabled = config.CONSOLE_MODE == "progress"
+        self._render()
+
+    def advance(self, count=1):
+        with _console_lock:
+            self.done += count
+            self._render()
+
+    def update(self, done):
+        with _console_lock:
+            self.done = done
+            self._render()
+
+    def close(self):
+        if self.enabled:
+            sys.stderr.write("\n")
+            sys.stderr.flush()
+            self.enabled = False
+
+    def _render(self):
+        if not self.enabled:
+            return
+        filled = self.width * self.done // self.total if self.total else self.width
+        bar = "#" * filled + "-" * (self.width - filled)
+        sys.stderr.write(f"\r[{bar}] {self.done}/{self.total} {self.unit}")
+        sys.stderr.flush()
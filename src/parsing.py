@@ -0,0 +1,91 @@
+import re
+import json
+from . import config
+
+# --- Output Schemas ---
+
+def _shot_properties():
+    last = config.GRID_SIZE - 1
+    return {
+        "row": {"type": "integer", "description": f"The row to target (0-{last})."},
+        "col": {"type": "integer", "description": f"The column to target (0-{last})."},
+    }
+
+
+def shot_schema(candidates=1):
+    """
+    JSON schema of a move answer: one {"row", "col"} object, or with `candidates` > 1 an
+    object whose "shots" list holds up to that many shots, best first.
+    """
+    shot = {"type": "object", "properties": _shot_properties(), "required": ["row", "col"]}
+    if candidates <= 1:
+        return shot
+    return {
+        "type": "object",
+        "properties": {"shots": {"type": "array", "items": shot, "description": f"Up to {candidates} shots, best first."}},
+        "required": ["shots"],
+    }
+
+
+def ollama_format(candidates=1):
+    """The `format` sent to Ollama: the schema with coordinate bounds, so decoding is constrained to legal shapes."""
+    schema = shot_schema(candidates)
+    shot = schema if candidates <= 1 else schema["properties"]["shots"]["items"]
+    for prop in shot["properties"].values():
+        prop.update(minimum=0, maximum=config.GRID_SIZE - 1)
+    if candidates > 1:
+        schema["properties"]["shots"].update(minItems=1, maxItems=candidates)
+    return schema
+
+
+# --- Tolerant Extraction ---
+
+_JSON_SPAN = re.compile(r"[\[{].*[\]}]", re.DOTALL)
+_ROW_COL = re.compile(r"row\W{0,3}(\d+)\W+(?:col(?:umn)?)\W{0,3}(\d+)", re.IGNORECASE)
+_PAIR = re.compile(r"\(\s*(\d+)\s*,\s*(\d+)\s*\)|\[\s*(\d+)\s*,\s*(\d+)\s*\]|\b(\d+)\s*,\s*(\d+)\b")
+
+
+def extract_shots(text):
+    """
+    Returns every (row, col) found in a model answer, in the order given. Accepts the schema
+    shapes, JSON wrapped in prose or code fences, and free text such as "row 3, col 5" or "(3, 5)".
+    """
+    if not isinstance(text, str):
+        return _shots_from_json(text)
+    for candidate in (text, *(m.group(0) for m in _JSON_SPAN.finditer(text))):
+        try:
+            shots = _shots_from_json(json.loads(candidate))
+        except (ValueError, TypeError):
+            continue
+        if shots:
+            return shots
+    shots = [(int(r), int(c)) for r, c in _ROW_COL.findall(text)]
+    if shots:
+        return shots
+    return [tuple(int(v) for v in match if v) for match in _PAIR.findall(text)]
+
+
+def _shots_from_json(data):
+    if isinstance(data, dict):
+        if "row" in data and "col" in data:
+            try:
+                return [(int(data["row"]), int(data["col"]))]
+            except (TypeError, ValueError):
+                return []
+        for key in ("shots", "candidates", "moves"):
+            if isinstance(data.get(key), list):
+                return _shots_from_json(data[key])
+        return []
+    if isinstance(data, list):
+        if len(data) == 2 and all(isinstance(v, int) for v in data):
+            return [tuple(data)]
+        return [shot for item in data for shot in _shots_from_json(item)]
+    return []
+
+
+def first_legal(shots, opponent_view):
+    """Returns the first shot that is on the board and not yet targeted, or None."""
+    for row, col in shots:
+        if 0 <= row < config.GRID_SIZE and 0 <= col < config.GRID_SIZE and opponent_view[row][col] == 'W':
+            return row, col
+    return None
@@ -0,0 +1,175 @@
+import random
+import numpy as np
+from . import density
+from .board import HIT, MISS
+
+# --- Player Interface ---
+
+class Player:
+    """
+    Something that can choose shots in a BattleshipGame. Subclasses implement choose_shot,
+    which receives the game and the player's own past moves ([{"shot": (r, c), "result": ...}]).
+    Players may fill the optional `move_info` dict with details stored alongside the turn.
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def choose_shot(self, game, past_moves, move_info=None):
+        raise NotImplementedError
+
+
+class LLMPlayer(Player):
+    """
+    Asks the player's configured LLM provider for every shot. With `session_mode`, the player
+    keeps one chat conversation for the game and only sends what changed each turn.
+    """
+    def __init__(self, name, session_mode=False, candidates=1):
+        super().__init__(name)
+        self.session = None
+        if session_mode:
+            from . import sessions
+            self.session = sessions.ChatSession(name, candidates)
+
+    def choose_shot(self, game, past_moves, move_info=None):
+        # Imported here so headless bot runs never load the provider SDKs.
+        from . import llm
+        return llm.get_llm_move(
+            self.name,
+            game.get_opponent_view(self.name),
+            game.get_own_ships_status(self.name),
+            past_moves,
+            move_info,
+            session=self.session
+        )
+
+
+# --- Baseline Bots ---
+# Bots only read the shot state of the target board (hits, misses, targeted cells),
+# plus the lengths of enemy ships still afloat, which the game announces when a ship sinks.
+
+class RandomBot(Player):
+    """Fires at a uniformly random untargeted cell."""
+    def __init__(self, name, seed=None):
+        super().__init__(name)
+        self.rng = random.Random(seed)
+
+    def choose_shot(self, game, past_moves, move_info=None):
+        board = game.get_target_board(self.name)
+        return self._random_untargeted(board, lambda idx: True)
+
+    def _random_untargeted(self, board, allowed):
+        """Picks a random untargeted cell for which allowed(idx) is true, or any untargeted cell."""
+        cells = board.cells
+        # Rejection sampling is fast while the board is mostly untargeted.
+        for _ in range(64):
+            idx = self.rng.randrange(len(cells))
+            if cells[idx] < HIT and allowed(idx):
+                return divmod(idx, board.size)
+        candidates = [idx for idx in range(len(cells)) if cells[idx] < HIT and allowed(idx)]
+        if not candidates:
+            candidates = [idx for idx in range(len(cells)) if cells[idx] < HIT]
+        return divmod(self.rng.choice(candidates), board.size)
+
+
+class HuntTargetBot(RandomBot):
+    """
+    Hunts randomly until it scores a hit, then targets the neighbours of unresolved hits,
+    preferring cells that extend a line of two or more hits.
+    """
+    def choose_shot(self, game, past_moves, move_info=None):
+        board = game.get_target_board(self.name)
+        target = self._target_shot(game, board)
+        if target is not None:
+            return target
+        return self._hunt_shot(game, board)
+
+    def _hunt_shot(self, game, board):
+        return self._random_untargeted(board, lambda idx: True)
+
+    def _target_shot(self, game, board):
+        """Returns a shot next to an unresolved hit, or None when every hit belongs to a sunk ship."""
+        if game.unresolved_hit_count(self.name) <= 0:
+            return None
+        hit_cells = _bit_indices(board.hits)
+
+        n = board.size
+        cells = board.cells
+        hit_set = set(hit_cells)
+        in_line, adjacent = [], []
+        for idx in hit_cells:
+            row, col = divmod(idx, n)
+            for d_row, d_col in ((0, 1), (0, -1), (1, 0), (-1, 0)):
+                r, c = row + d_row, col + d_col
+                if not (0 <= r < n and 0 <= c < n) or cells[r * n + c] >= HIT:
+                    continue
+                # The cell behind this hit is also a hit, so (r, c) extends a line.
+                back_r, back_c = row - d_row, col - d_col
+                if 0 <= back_r < n and 0 <= back_c < n and back_r * n + back_c in hit_set:
+                    in_line.append((r, c))
+                else:
+                    adjacent.append((r, c))
+        candidates = in_line or adjacent
+        return self.rng.choice(candidates) if candidates else None
+
+
+class ParityBot(HuntTargetBot):
+    """Hunt/target bot that only hunts on a checkerboard spaced by the smallest ship still afloat."""
+    def _hunt_shot(self, game, board):
+        lengths = game.remaining_ship_lengths(self.name)
+        spacing = min(lengths) if lengths else 1
+        n = board.size
+        return self._random_untargeted(board, lambda idx: (idx // n + idx % n) % spacing == 0)
+
+
+class ProbabilityBot(Player):
+    """
+    Fires at the cell covered by the most placements of the enemy ships still afloat,
+    using the vectorized engine in density.py. Placements through unresolved hits are
+    weighted heavily, which drives target mode.
+    """
+    def __init__(self, name, seed=None):
+        super().__init__(name)
+        self.rng = random.Random(seed)
+
+    def choose_shot(self, game, past_moves, move_info=None):
+        board = game.get_target_board(self.name)
+        cells = np.frombuffer(board.cells, dtype=np.uint8).reshape(board.size, board.size)
+        scores = density.heatmap_from_masks(
+            cells == HIT,
+            cells == MISS,
+            game.remaining_ship_lengths(self.name),
+            game.unresolved_hit_count(self.name)
+        )
+        return density.best_shot(scores, self.rng)
+
+
+BOTS = {
+    "random": RandomBot,
+    "hunt_target": HuntTargetBot,
+    "parity": ParityBot,
+    "probability": ProbabilityBot,
+}
+
+
+def create_player(player_config, seed=None):
+    """
+    Builds the Player for a player configuration. Bots use provider 'bot' and a 'strategy' key;
+    a 'seed' in the configuration takes precedence over the `seed` argument.
+    """
+    if player_config["provider"] == "bot":
+        return BOTS[player_config["strategy"]](player_config["name"], seed=player_config.get("seed", seed))
+    return LLMPlayer(
+        player_config["name"],
+        session_mode=player_config.get("session_mode", False),
+        candidates=player_config.get("candidate_shots", 1)
+    )
+
+
+def _bit_indices(mask):
+    """Returns the indices of the set bits of an integer mask."""
+    indices = []
+    while mask:
+        low_bit = mask & -mask
+        indices.append(low_bit.bit_length() - 1)
+        mask ^= low_bit
+    return indices
@@ -0,0 +1,200 @@
+import json
+from . import config, density
+
+# --- Board Encodings ---
+# "json":  the grid as pretty-printed JSON (the original format, grows quadratically with GRID_SIZE)
+# "rows":  one string per row, prefixed with the row number
+# "rle":   one run-length encoded row per line, e.g. "3: W4 H1 W5"
+# "shots": only the targeted cells, listed as hits and misses
+BOARD_FORMATS = ("json", "rows", "rle", "shots")
+
+# Tried in order when a prompt is over the player's token budget.
+_COMPACTION_STEPS = (
+    {"history_length": 5},
+    {"history_length": 0},
+    {"board_format": "rle"},
+    {"board_format": "shots"},
+)
+
+
+def encode_board(view, board_format):
+    """Encodes an opponent view (list of rows of 'W'/'H'/'M') in one of BOARD_FORMATS."""
+    if board_format == "json":
+        return json.dumps(view, indent=2)
+    if board_format == "rows":
+        return "\n" + "\n".join(f"{r}: {''.join(row)}" for r, row in enumerate(view))
+    if board_format == "rle":
+        return "\n" + "\n".join(f"{r}: {_run_length(row)}" for r, row in enumerate(view))
+    if board_format == "shots":
+        hits = [(r, c) for r, row in enumerate(view) for c, cell in enumerate(row) if cell == "H"]
+        misses = [(r, c) for r, row in enumerate(view) for c, cell in enumerate(row) if cell == "M"]
+        return (
+            f"every cell is 'W' except these. Hits: {_cell_list(hits)}. Misses: {_cell_list(misses)}."
+        )
+    raise ValueError(f"Unknown board format '{board_format}'. Expected one of {BOARD_FORMATS}.")
+
+
+def _run_length(row):
+    """Run-length encodes one row, e.g. ['W', 'W', 'H'] -> 'W2 H1'."""
+    runs = []
+    previous, count = row[0], 0
+    for cell in row:
+        if cell == previous:
+            count += 1
+        else:
+            runs.append(f"{previous}{count}")
+            previous, count = cell, 1
+    runs.append(f"{previous}{count}")
+    return " ".join(runs)
+
+
+def _cell_list(cells):
+    return ", ".join(f"({r}, {c})" for r, c in cells) if cells else "none"
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English and JSON)."""
+    return (len(text) + 3) // 4
+
+
+# --- Prompt Assembly ---
+
+def density_hint(opponent_view, past_moves):
+    """Builds a prompt hint listing the cells the probability-density engine rates most likely."""
+    sunk_names = [m["result"][len("SUNK "):] for m in past_moves if m.get("result", "").startswith("SUNK ")]
+    remaining_lengths = []
+    sunk_cells = 0
+    for ship in config.SHIPS_CONFIG:
+        if ship["name"] in sunk_names:
+            sunk_names.remove(ship["name"])
+            sunk_cells += ship["length"]
+        else:
+            remaining_lengths.append(ship["length"])
+    hit_cells = sum(row.count("H") for row in opponent_view)
+    scores = density.heatmap(opponent_view, remaining_lengths, hit_cells - sunk_cells)
+    cells = ", ".join(f"({r}, {c})" for r, c in density.top_cells(scores, config.DENSITY_HINT_CELLS))
+    return f"Hint: based on where the remaining enemy ships can still fit, the most likely cells are (best first): {cells}."
+
+
+def build_prompt(player_name, opponent_view, own_ships_status, past_moves, error_history=(),
+                 hint="", board_format="json", history_length=10, candidates=1):
+    """Assembles the move prompt sent to the LLM. With `candidates` > 1 it asks for a ranked list of shots."""
+    last = config.GRID_SIZE - 1
+    compact = board_format != "json"
+    lines = [
+        f"You are a world-class Battleship player, {player_name}. It's your turn.",
+        f"Your goal: Sink all enemy ships on the {config.GRID_SIZE}x{config.GRID_SIZE} grid.",
+        f"Coordinates are (row, col), from (0, 0) to ({last}, {last}).",
+        "'W' = Water (unknown), 'H' = Hit, 'M' = Miss.",
+    ]
+    if error_history:
+        lines.append("IMPORTANT: You have made invalid moves. Please correct your strategy based on the following errors:")
+        lines.extend(f"- {error}" for error in error_history)
+        lines.append("Choose a new, valid coordinate from the available 'W' cells.")
+    if compact:
+        fleet = "; ".join(
+            f"{s['name']} ({s['length']}): " + ("sunk" if s["sunk"] else f"{s['hits']} hits") for s in own_ships_status
+        )
+        lines.append(f"Your Fleet Status: {fleet}")
+    else:
+        lines.append(f"Your Fleet Status: {json.dumps(own_ships_status, indent=2)}")
+    lines.append(f"Enemy Waters (Your View): {encode_board(opponent_view, board_format)}")
+    if history_length:
+        recent = past_moves[-history_length:]
+        if compact:
+            moves = "; ".join(f"({m['shot'][0]}, {m['shot'][1]}) {m.get('result', '')}".rstrip() for m in recent)
+            lines.append(f"Your Recent Moves (last {history_length}): {moves or 'none'}")
+        else:
+            lines.append(f"Your Recent Moves (last {history_length}): {json.dumps(recent, indent=2)}")
+    if hint:
+        lines.append(hint)
+    if candidates > 1:
+        lines.append(
+            f"Analyze the board. Think strategically. Provide your {candidates} best shots, best first, "
+            "as a JSON object with a 'shots' list of objects with 'row' and 'col'."
+        )
+    else:
+        lines.append("Analyze the board. Think strategically. Provide your next shot as a JSON object with 'row' and 'col'.")
+    lines.append("Do not fire at a location you have already targeted ('H' or 'M').")
+    return "\n".join(lines)
+
+
+def build_prompt_within_budget(player_name, opponent_view, own_ships_status, past_moves, error_history=(),
+                               hint="", board_format="json", token_budget=None, candidates=1):
+    """
+    Builds the prompt in the requested format, then applies those _COMPACTION_STEPS that
+    shrink it, in order, until the estimated token count fits `token_budget` (or no steps are left).
+    Returns (prompt, estimated_tokens, board_format_used).
+    """
+    options = {"board_format": board_format, "history_length": 10, "candidates": candidates}
+    prompt = build_prompt(player_name, opponent_view, own_ships_status, past_moves, error_history, hint, **options)
+    tokens = estimate_tokens(prompt)
+    if token_budget:
+        for step in _COMPACTION_STEPS:
+            if tokens <= token_budget:
+                break
+            if step.get("board_format") and BOARD_FORMATS.index(step["board_format"]) <= BOARD_FORMATS.index(options["board_format"]):
+                continue
+            if step.get("history_length") is not None and step["history_length"] >= options["history_length"]:
+                continue
+            candidate_options = dict(options, **step)
+            candidate = build_prompt(player_name, opponent_view, own_ships_status, past_moves, error_history, hint, **candidate_options)
+            candidate_tokens = estimate_tokens(candidate)
+            # A late-game 'shots' list can be longer than the grid it replaces.
+            if candidate_tokens < tokens:
+                options, prompt, tokens = candidate_options, candidate, candidate_tokens
+    return prompt, tokens, options["board_format"]
+
+
+# --- Chat Sessions ---
+# Session mode (see sessions.py) sends the instructions once as a stable system message, a full
+# snapshot of the game, and afterwards only what changed, so a server that caches the prompt
+# prefix only has to evaluate the new tokens.
+
+def session_instructions(player_name, candidates=1):
+    """The stable system message of a chat session."""
+    last = config.GRID_SIZE - 1
+    if candidates > 1:
+        answer = (f"Answer every turn with your {candidates} best shots, best first, as a JSON object "
+                  "with a 'shots' list of objects with 'row' and 'col'.")
+    else:
+        answer = "Answer every turn with your next shot as a JSON object with 'row' and 'col'."
+    return "\n".join([
+        f"You are a world-class Battleship player, {player_name}.",
+        f"Your goal: Sink all enemy ships on the {config.GRID_SIZE}x{config.GRID_SIZE} grid.",
+        f"Coordinates are (row, col), from (0, 0) to ({last}, {last}).",
+        "'W' = Water (unknown), 'H' = Hit, 'M' = Miss.",
+        "You first get the full state of the game; after that, each turn tells you the result of your last shot.",
+        "Keep track of the enemy board yourself. Never fire at a location you have already targeted.",
+        answer,
+    ])
+
+
+def _fleet_line(own_ships_status):
+    return "Your Fleet Status: " + "; ".join(
+        f"{s['name']} ({s['length']}): " + ("sunk" if s["sunk"] else f"{s['hits']} hits") for s in own_ships_status
+    )
+
+
+def session_snapshot(opponent_view, own_ships_status, hint=""):
+    """The full game state that opens (or re-opens) a chat session."""
+    lines = [
+        _fleet_line(own_ships_status),
+        f"Enemy Waters (Your View): {encode_board(opponent_view, 'rows')}",
+    ]
+    if hint:
+        lines.append(hint)
+    lines.append("It's your turn.")
+    return "\n".join(lines)
+
+
+def session_update(new_moves, own_ships_status=None, hint=""):
+    """A per-turn delta: the results of the shots since the last message, and the fleet if it changed."""
+    lines = [f"Your shot at ({m['shot'][0]}, {m['shot'][1]}): {m.get('result', 'unknown')}." for m in new_moves]
+    if own_ships_status is not None:
+        lines.append(_fleet_line(own_ships_status))
+    if hint:
+        lines.append(hint)
+    lines.append("It's your turn.")
+    return "\n".join(lines)
+
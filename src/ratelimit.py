@@ -0,0 +1,93 @@
+import time
+import random
+import threading
+from . import config
+
+
+class TokenBucket:
+    """Thread-safe token bucket holding up to `capacity` tokens, refilled at `capacity` per minute."""
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _reserve(self, amount):
+        """Takes `amount` tokens (going into debt if needed) and returns how long the caller must wait."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Requests larger than the bucket would never fit, so they only wait for a full bucket.
+            self.tokens -= min(amount, self.capacity)
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self, amount=1):
+        """Blocks the calling thread only as long as the quota requires. Returns the seconds waited."""
+        wait = self._reserve(amount)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class RateLimiter:
+    """Request-per-minute and token-per-minute quotas for one provider account."""
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def acquire(self, tokens=0):
+        """Waits until one request of about `tokens` tokens fits the quotas. Returns the seconds waited."""
+        waited = 0.0
+        if self.requests is not None:
+            waited += self.requests.acquire(1)
+        if self.tokens is not None and tokens:
+            waited += self.tokens.acquire(tokens)
+        return waited
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(player_config):
+    """
+    Returns the shared limiter for the player's provider account. Players using the same
+    provider and API key (or the same Ollama server) share one quota.
+    """
+    key = (player_config["provider"], player_config.get("api_key_env") or player_config.get("api_base"))
+    requests_per_minute = player_config.get("requests_per_minute")
+    if requests_per_minute is None and player_config.get("api_sleep_time"):
+        # Older configurations expressed the quota as a fixed sleep after every turn.
+        requests_per_minute = 60.0 / player_config["api_sleep_time"]
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = RateLimiter(requests_per_minute, player_config.get("tokens_per_minute"))
+        return _limiters[key]
+
+
+def is_retryable(error):
+    """Checks whether an exception is a rate limit (429), a server error (5xx) or a transport failure."""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is None:
+        code = getattr(error, "code", None) # google.api_core exceptions carry the HTTP status here
+        status = code if isinstance(code, int) else None
+    if status is not None:
+        return status == 429 or status >= 500
+    return type(error).__name__ in ("ConnectionError", "Timeout", "ReadTimeout", "ConnectTimeout")
+
+
+def backoff_delay(attempt, error=None):
+    """
+    Returns how long to wait before retry number `attempt` (0-based): exponential backoff
+    with full jitter, or the server's Retry-After value when it sends one.
+    """
+    response = getattr(error, "response", None)
+    retry_after = getattr(response, "headers", {}).get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), config.BACKOFF_MAX_SECONDS)
+        except ValueError:
+            pass
+    return random.uniform(0, min(config.BACKOFF_MAX_SECONDS, config.BACKOFF_BASE_SECONDS * 2 ** attempt))
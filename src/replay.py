@@ -0,0 +1,66 @@
+import json
+import sqlite3
+from . import config
+from .game import BattleshipGame
+
+# Rebuilds recorded games from the database without calling any model. Only the shots are
+# stored, so every state is replayed from the initial layouts, which the game seed regenerates.
+
+
+def board_views(moves, player1_name, grid_size):
+    """
+    Yields each player's view of the enemy waters after every move, keyed by
+    'LLM_1' (player 1's view) and 'LLM_2' (player 2's view).
+    """
+    views = {
+        "LLM_1": [["W"] * grid_size for _ in range(grid_size)],
+        "LLM_2": [["W"] * grid_size for _ in range(grid_size)],
+    }
+    for move in moves:
+        key = "LLM_1" if move['player_name'] == player1_name else "LLM_2"
+        result = move['result']
+        if result != "DUPLICATE":
+            views[key][move['shot_row']][move['shot_col']] = "M" if result == "MISS" else "H"
+        yield {name: [row[:] for row in view] for name, view in views.items()}
+
+
+def rebuild_game(game_id, turn=None, db_file=None):
+    """
+    Returns (game, past_moves): the BattleshipGame as it stood after `turn` turns (default: all
+    recorded turns) and each player's past moves in the form players receive them.
+    Raises LookupError for an unknown game and ValueError if its layouts cannot be regenerated.
+    """
+    conn = sqlite3.connect(db_file or config.DB_FILE)
+    conn.row_factory = sqlite3.Row
+    try:
+        game_info = conn.execute("SELECT * FROM games WHERE game_id = ?", (game_id,)).fetchone()
+        if game_info is None:
+            raise LookupError(f"Game {game_id} not found.")
+        if game_info['seed'] is None:
+            raise ValueError(f"Game {game_id} was recorded without a seed, so its layouts cannot be regenerated.")
+        boards = {
+            row['player_name']: json.loads(row['ship_placements'])
+            for row in conn.execute("SELECT player_name, ship_placements FROM boards WHERE game_id = ?", (game_id,))
+        }
+        query = "SELECT player_name, shot_row, shot_col, result FROM moves WHERE game_id = ?"
+        args = [game_id]
+        if turn is not None:
+            query += " AND turn <= ?"
+            args.append(turn)
+        moves = conn.execute(query + " ORDER BY turn", args).fetchall()
+    finally:
+        conn.close()
+
+    game = BattleshipGame(game_id, game_info['player1_name'], game_info['player2_name'], record=False, seed=game_info['seed'])
+    for name, data in game.players.items():
+        if name in boards and data["board"].to_grid() != boards[name]:
+            raise ValueError(f"Game {game_id} was played with a different grid or fleet than the current configuration.")
+
+    past_moves = {name: [] for name in game.player_names}
+    for move in moves:
+        game.turn += 1
+        result = game.process_shot(move['player_name'], move['shot_row'], move['shot_col'])
+        if result != move['result']:
+            raise ValueError(f"Game {game_id} diverged at turn {game.turn}: recorded {move['result']}, replayed {result}.")
+        past_moves[move['player_name']].append({"shot": (move['shot_row'], move['shot_col']), "result": result})
+    return game, past_moves
@@ -0,0 +1,99 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from . import config, database, game, layouts, logs, players
+
+logger = logging.getLogger(__name__)
+
+# Player configuration keys stored with every game so results can be grouped by them later.
+RECORDED_SETTINGS = ("provider", "model", "strategy", "temperature", "density_hint", "board_format", "prompt_token_budget", "candidate_shots", "session_mode")
+
+
+def play_game(player1_config, player2_config, game_number=None, seed=None, job_id=None):
+    """
+    Plays a single game to completion and returns (game_id, winner, turns).
+    `seed` fixes the fleet layouts (and the bots' choices); by default it is derived
+    from BASE_SEED and the game number, or drawn at random. `job_id` is recorded
+    with the game when it is played for a tournament job.
+    """
+    player_configs = {
+        player1_config["name"]: player1_config,
+        player2_config["name"]: player2_config,
+    }
+    player1_name = player1_config["name"]
+    player2_name = player2_config["name"]
+
+    settings = {
+        name: {key: player_config[key] for key in RECORDED_SETTINGS if key in player_config}
+        for name, player_config in player_configs.items()
+    }
+    if seed is None:
+        if config.BASE_SEED is not None and game_number is not None:
+            seed = layouts.derive_seed(config.BASE_SEED, game_number)
+        else:
+            seed = layouts.new_seed()
+    game_id = database.create_new_game(
+        player1_name, player2_name, settings, response_cache=config.RESPONSE_CACHE_ENABLED, seed=seed, job_id=job_id
+    )
+    label = f"Game {game_id}" if game_number is None else f"Game {game_id} (#{game_number}/{config.NUMBER_OF_GAMES})"
+    logger.info(f"--- Starting {label} ({player1_name} vs {player2_name}) ---")
+    logs.console(f"\n--- Starting {label} ({player1_name} vs {player2_name}) ---")
+
+    current_game = game.BattleshipGame(
+        game_id,
+        player1_name=player1_name,
+        player2_name=player2_name,
+        seed=seed
+    )
+
+    seats = {
+        name: players.create_player(player_config, seed=f"{seed}:player:{seat}")
+        for seat, (name, player_config) in enumerate(player_configs.items())
+    }
+    player_moves = {p_name: [] for p_name in player_configs.keys()}
+
+    while not current_game.winner:
+        current_game.turn += 1
+        current_player_name = current_game.player_names[(current_game.turn - 1) % 2]
+
+        logs.console(f"[Game {game_id}] Turn {current_game.turn}: {current_player_name}'s move.")
+
+        move_info = {}
+        row, col = seats[current_player_name].choose_shot(current_game, player_moves[current_player_name], move_info)
+
+        player_moves[current_player_name].append({"shot": (row, col)})
+        result = current_game.process_shot(current_player_name, row, col, move_info)
+        logs.console(f"[Game {game_id}] Result: {result}")
+
+        player_moves[current_player_name][-1]["result"] = result
+
+    logger.info(f"--- Game {game_id} Over! Winner: {current_game.winner} in {current_game.turn} turns. ---")
+    logs.console(f"\n--- Game {game_id} Over! Winner: {current_game.winner} in {current_game.turn} turns. ---")
+    database.update_game_winner(game_id, current_game.winner, current_game.turn)
+    return game_id, current_game.winner, current_game.turn
+
+
+def run_tournament(player1_config, player2_config, number_of_games=None, max_concurrent_games=None):
+    """
+    Plays a series of games, keeping up to `max_concurrent_games` in flight at once.
+    Each game runs its turns in strict order on its own worker thread, so turns from
+    different games interleave and keep the LLM backends busy.
+    """
+    number_of_games = config.NUMBER_OF_GAMES if number_of_games is None else number_of_games
+    max_concurrent_games = config.MAX_CONCURRENT_GAMES if max_concurrent_games is None else max_concurrent_games
+
+    results = []
+    progress = logs.Progress(number_of_games)
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrent_games), thread_name_prefix="game") as executor:
+        futures = [
+            executor.submit(play_game, player1_config, player2_config, i + 1)
+            for i in range(number_of_games)
+        ]
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.exception(f"A game crashed and was abandoned: {e}")
+                print(f"A game crashed and was abandoned: {e}")
+            progress.advance()
+    progress.close()
+    return results
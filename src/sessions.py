@@ -0,0 +1,47 @@
+from . import config, prompts
+
+
+class ChatSession:
+    """
+    The running conversation of one player in one game, for providers with a chat endpoint.
+    Messages are only ever appended, so the server can reuse its cache of everything sent
+    before and evaluate just the newest turn. The session restarts from a fresh snapshot
+    every SESSION_MAX_TURNS turns, and after any error.
+    """
+    def __init__(self, player_name, candidates=1):
+        self.player_name = player_name
+        self.candidates = candidates
+        self.reset()
+
+    def reset(self):
+        """Drops the conversation; the next turn starts with the full game state."""
+        self.messages = []
+        self.turns = 0
+        self.reported_moves = 0
+        self.fleet = None
+
+    def next_messages(self, opponent_view, own_ships_status, past_moves, hint=""):
+        """Appends this turn's user message and returns the whole conversation to send."""
+        if not self.messages or self.turns >= config.SESSION_MAX_TURNS:
+            self.reset()
+            self.messages = [
+                {"role": "system", "content": prompts.session_instructions(self.player_name, self.candidates)},
+                {"role": "user", "content": prompts.session_snapshot(opponent_view, own_ships_status, hint)},
+            ]
+        else:
+            fleet_changed = own_ships_status != self.fleet
+            self.messages.append({
+                "role": "user",
+                "content": prompts.session_update(
+                    past_moves[self.reported_moves:], own_ships_status if fleet_changed else None, hint
+                ),
+            })
+        self.turns += 1
+        self.reported_moves = len(past_moves)
+        # The game hands out immutable snapshots of the fleet status, so keeping a reference is safe.
+        self.fleet = own_ships_status
+        return self.messages
+
+    def record_answer(self, content):
+        """Appends the model's accepted answer, keeping the conversation an exact prefix of the next call."""
+        self.messages.append({"role": "assistant", "content": content})
@@ -0,0 +1,88 @@
+import os
+import random
+import time
+from multiprocessing import Pool
+from . import game, players
+
+
+def play_headless(bot1, bot2, seed=None):
+    """
+    Plays one game between two baseline bots without touching the database or the console.
+    Returns (winner_index, turns), where winner_index is 0 for bot1 and 1 for bot2.
+    """
+    player1_name, player2_name = f"{bot1}#1", f"{bot2}#2"
+    rng = random.Random(seed)
+    seats = [
+        players.BOTS[bot1](player1_name, seed=rng.random()),
+        players.BOTS[bot2](player2_name, seed=rng.random()),
+    ]
+    current_game = game.BattleshipGame(None, player1_name, player2_name, record=False, seed=rng.randrange(2**63))
+    past_moves = ([], [])
+    while not current_game.winner:
+        current_game.turn += 1
+        seat = (current_game.turn - 1) % 2
+        player = seats[seat]
+        row, col = player.choose_shot(current_game, past_moves[seat])
+        result = current_game.process_shot(player.name, row, col)
+        past_moves[seat].append({"shot": (row, col), "result": result})
+    return (0 if current_game.winner == player1_name else 1), current_game.turn
+
+
+def _play_batch(args):
+    """
+    Worker entry point: plays a chunk of games and returns aggregated counts. The bots take
+    turns moving first, so neither result carries the first-mover advantage.
+    """
+    bot1, bot2, number_of_games, seed = args
+    wins = [0, 0]
+    turns = [0, 0]
+    for i in range(number_of_games):
+        if i % 2 == 0:
+            winner, game_turns = play_headless(bot1, bot2, seed=f"{seed}:{i}")
+        else:
+            winner, game_turns = play_headless(bot2, bot1, seed=f"{seed}:{i}")
+            winner = 1 - winner
+        wins[winner] += 1
+        turns[winner] += game_turns
+    return wins, turns
+
+
+def run_headless(bot1, bot2, number_of_games, processes=None, chunk_size=500, seed=None):
+    """
+    Plays `number_of_games` headless games across a process pool and returns a summary
+    with win counts, win rates and average turns per winning game for each bot.
+    """
+    processes = processes or os.cpu_count() or 1
+    base_seed = random.randrange(2**32) if seed is None else seed
+    chunks = []
+    remaining = number_of_games
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        chunks.append((bot1, bot2, size, base_seed + len(chunks)))
+        remaining -= size
+
+    wins = [0, 0]
+    turns = [0, 0]
+    start = time.perf_counter()
+    with Pool(processes) as pool:
+        for chunk_wins, chunk_turns in pool.imap_unordered(_play_batch, chunks):
+            for i in range(2):
+                wins[i] += chunk_wins[i]
+                turns[i] += chunk_turns[i]
+    elapsed = time.perf_counter() - start
+
+    return {
+        "games": number_of_games,
+        "seed": base_seed,
+        "elapsed_seconds": elapsed,
+        "games_per_hour": number_of_games / elapsed * 3600 if elapsed else None,
+        "bots": [
+            {
+                "name": name,
+                "wins": wins[i],
+                "win_rate": wins[i] / number_of_games if number_of_games else 0.0,
+                "avg_turns_to_win": turns[i] / wins[i] if wins[i] else None,
+            }
+            for i, name in enumerate((f"{bot1}#1", f"{bot2}#2"))
+        ],
+    }
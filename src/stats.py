@@ -0,0 +1,126 @@
+# Materialized per-player statistics. The player_stats table is updated in the transaction that
+# records a game's result, so reading a leaderboard never scans moves.
+# A game's shots are counted together with its result, once it finishes: games that are
+# abandoned (a provider that never recovers, a crashed process) add nothing, so hit rates and
+# the other per-shot rates cover exactly the games counted as played.
+# Games flagged with response_cache are left out, so the leaderboard reflects fresh sampling only.
+
+def create_tables(cursor):
+    """Creates the aggregate tables if they don't exist."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS player_stats (
+        player_name TEXT PRIMARY KEY,
+        games INTEGER NOT NULL DEFAULT 0,
+        wins INTEGER NOT NULL DEFAULT 0,
+        win_turns INTEGER NOT NULL DEFAULT 0,
+        shots INTEGER NOT NULL DEFAULT 0,
+        hits INTEGER NOT NULL DEFAULT 0,
+        duplicates INTEGER NOT NULL DEFAULT 0,
+        invalid_attempts INTEGER NOT NULL DEFAULT 0,
+        random_fallbacks INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+
+
+def apply_turns(conn, turn_rows):
+    """
+    Adds turn records to the aggregates. Rows have the layout written to moves:
+    (game_id, turn, player_name, shot_row, shot_col, result, invalid_attempts, random_fallback).
+    """
+    totals = {}
+    for row in turn_rows:
+        player_name, result = row[2], row[5]
+        counts = totals.setdefault(player_name, [0, 0, 0, 0, 0])
+        counts[0] += 1
+        counts[1] += result == "HIT" or result.startswith("SUNK")
+        counts[2] += result == "DUPLICATE"
+        counts[3] += row[6]
+        counts[4] += bool(row[7])
+    conn.executemany(
+        """
+        INSERT INTO player_stats (player_name, shots, hits, duplicates, invalid_attempts, random_fallbacks)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (player_name) DO UPDATE SET
+            shots = shots + excluded.shots,
+            hits = hits + excluded.hits,
+            duplicates = duplicates + excluded.duplicates,
+            invalid_attempts = invalid_attempts + excluded.invalid_attempts,
+            random_fallbacks = random_fallbacks + excluded.random_fallbacks
+        """,
+        [(name, *counts) for name, counts in totals.items()]
+    )
+
+
+def apply_game_result(conn, game_id, winner, turns):
+    """Counts a finished game, and the turns recorded for it, for both of its players."""
+    game = conn.execute("SELECT player1_name, player2_name, response_cache FROM games WHERE game_id = ?", (game_id,)).fetchone()
+    if game is None or game[2]:
+        return
+    players = game[:2]
+    conn.executemany(
+        """
+        INSERT INTO player_stats (player_name, games, wins, win_turns) VALUES (?, 1, ?, ?)
+        ON CONFLICT (player_name) DO UPDATE SET
+            games = games + 1,
+            wins = wins + excluded.wins,
+            win_turns = win_turns + excluded.win_turns
+        """,
+        [(name, int(name == winner), turns if name == winner else 0) for name in players]
+    )
+    apply_turns(conn, conn.execute(
+        "SELECT game_id, turn, player_name, shot_row, shot_col, result, COALESCE(invalid_attempts, 0), "
+        "COALESCE(random_fallback, 0) FROM moves WHERE game_id = ?",
+        (game_id,)
+    ).fetchall())
+
+
+def backfill(conn):
+    """Rebuilds the aggregates from the games and moves tables (one-time, for existing databases)."""
+    conn.execute("DELETE FROM player_stats")
+    conn.execute("""
+    INSERT INTO player_stats (player_name, shots, hits, duplicates, invalid_attempts, random_fallbacks)
+    SELECT
+        player_name,
+        COUNT(*),
+        SUM(result = 'HIT' OR result LIKE 'SUNK%'),
+        SUM(result = 'DUPLICATE'),
+        SUM(COALESCE(invalid_attempts, 0)),
+        SUM(COALESCE(random_fallback, 0) != 0)
+    FROM moves
+    WHERE game_id IN (SELECT game_id FROM games WHERE winner IS NOT NULL AND NOT COALESCE(response_cache, 0))
+    GROUP BY player_name
+    """)
+    conn.execute("""
+    INSERT INTO player_stats (player_name, games, wins, win_turns)
+    SELECT player_name, COUNT(*), SUM(player_name = winner), SUM(CASE WHEN player_name = winner THEN turns ELSE 0 END)
+    FROM (
+        SELECT player1_name AS player_name, winner, turns FROM games WHERE winner IS NOT NULL AND NOT COALESCE(response_cache, 0)
+        UNION ALL
+        SELECT player2_name AS player_name, winner, turns FROM games WHERE winner IS NOT NULL AND NOT COALESCE(response_cache, 0)
+    )
+    WHERE true -- Required before an upsert clause that follows a SELECT
+    GROUP BY player_name
+    ON CONFLICT (player_name) DO UPDATE SET
+        games = excluded.games,
+        wins = excluded.wins,
+        win_turns = excluded.win_turns
+    """)
+
+
+def leaderboard_row(row):
+    """Turns a player_stats row into the rates shown by /api/stats."""
+    shots = row["shots"] or 0
+    games = row["games"] or 0
+    wins = row["wins"] or 0
+    return {
+        "player_name": row["player_name"],
+        "games": games,
+        "wins": wins,
+        "win_rate": wins / games if games else None,
+        "avg_turns_to_win": row["win_turns"] / wins if wins else None,
+        "shots": shots,
+        "hit_rate": row["hits"] / shots if shots else None,
+        "duplicate_rate": row["duplicates"] / shots if shots else None,
+        "invalid_move_rate": row["invalid_attempts"] / shots if shots else None,
+        "random_fallback_rate": row["random_fallbacks"] / shots if shots else None,
+    }
@@ -0,0 +1,300 @@
+import math
+import sqlite3
+import logging
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from . import config, database, layouts, logs
+
+logger = logging.getLogger(__name__)
+
+# Multi-player tournaments. The pairings are expanded into rows of the jobs table, which
+# worker processes drain in parallel. Each job plays one game; a job stays 'running' while
+# its game is in progress, so after a crash the unfinished jobs are found, their partial
+# games discarded, and only those jobs played again.
+
+FORMATS = ("round_robin", "swiss")
+
+
+# --- Pairings ---
+
+def round_robin_pairings(player_names, games_per_pairing):
+    """Every player meets every other player `games_per_pairing` times, alternating who moves first."""
+    pairings = []
+    for i, first in enumerate(player_names):
+        for second in player_names[i + 1:]:
+            for game_number in range(games_per_pairing):
+                pairings.append((first, second) if game_number % 2 == 0 else (second, first))
+    return pairings
+
+
+def swiss_pairings(standings, played, games_per_pairing, had_bye=()):
+    """
+    Pairs players with equal or similar scores who have not met yet (a rematch only when no
+    one else is left). `standings` is [(name, wins)], `played` a set of frozenset pairs.
+    With an odd number of players, the lowest-ranked player not in `had_bye` sits the round
+    out (the lowest-ranked of all once everyone had a bye). Returns (pairings, bye player or None).
+    """
+    ranked = [name for name, _ in sorted(standings, key=lambda entry: (-entry[1], entry[0]))]
+    bye = None
+    if len(ranked) % 2:
+        bye = next((name for name in reversed(ranked) if name not in had_bye), ranked[-1])
+        ranked.remove(bye)
+    pairings = []
+    while ranked:
+        first = ranked.pop(0)
+        opponent = next((name for name in ranked if frozenset((first, name)) not in played), ranked[0])
+        ranked.remove(opponent)
+        for game_number in range(games_per_pairing):
+            pairings.append((first, opponent) if game_number % 2 == 0 else (opponent, first))
+    return pairings, bye
+
+
+# --- Job Queue ---
+
+def _connect(db_file):
+    conn = sqlite3.connect(db_file, timeout=config.DB_BUSY_TIMEOUT)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def enqueue_round(conn, tournament, round_number, pairings, bye=None):
+    """
+    Adds one job per pairing. Jobs that already exist (on resume) are left untouched.
+    A `bye` player is recorded as a 'bye' row (slot -1) that is never claimed or played.
+    """
+    base_seed = config.BASE_SEED if config.BASE_SEED is not None else tournament
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO jobs (tournament, round, slot, player1_name, player2_name, seed) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (tournament, round_number, slot, first, second, layouts.derive_seed(base_seed, tournament, round_number, slot))
+                for slot, (first, second) in enumerate(pairings)
+            ]
+        )
+        if bye is not None:
+            conn.execute(
+                "INSERT OR IGNORE INTO jobs (tournament, round, slot, player1_name, status) VALUES (?, ?, -1, ?, 'bye')",
+                (tournament, round_number, bye)
+            )
+
+
+def claim_job(conn, tournament, worker):
+    """Atomically marks the oldest pending job as running for `worker` and returns it, or None."""
+    with conn:
+        return conn.execute(
+            """
+            UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, claimed_at = CURRENT_TIMESTAMP
+            WHERE job_id = (SELECT job_id FROM jobs WHERE tournament = ? AND status = 'pending' ORDER BY job_id LIMIT 1)
+            RETURNING job_id, player1_name, player2_name, seed
+            """,
+            (worker, tournament)
+        ).fetchone()
+
+
+def finish_job(conn, job_id, game_id):
+    with conn:
+        conn.execute(
+            "UPDATE jobs SET status = 'done', game_id = ?, error = NULL, finished_at = CURRENT_TIMESTAMP WHERE job_id = ?",
+            (game_id, job_id)
+        )
+
+
+def fail_job(conn, job_id, error):
+    """Discards the job's partial game and requeues it, or marks it failed after TOURNAMENT_MAX_ATTEMPTS."""
+    with conn:
+        _discard_unfinished_games(conn, job_id)
+        conn.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, error = ? WHERE job_id = ?",
+            (config.TOURNAMENT_MAX_ATTEMPTS, str(error), job_id)
+        )
+
+
+def recover_jobs(conn, tournament):
+    """
+    Settles jobs left 'running' by workers that died. A job whose game was finished is marked
+    done; otherwise its partial game is removed and the job is queued again. Returns the number of requeued jobs.
+    """
+    requeued = 0
+    with conn:
+        for job in conn.execute("SELECT job_id FROM jobs WHERE tournament = ? AND status = 'running'", (tournament,)).fetchall():
+            finished = conn.execute(
+                "SELECT game_id FROM games WHERE job_id = ? AND winner IS NOT NULL ORDER BY game_id LIMIT 1", (job["job_id"],)
+            ).fetchone()
+            if finished is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'done', game_id = ?, finished_at = CURRENT_TIMESTAMP WHERE job_id = ?",
+                    (finished["game_id"], job["job_id"])
+                )
+            else:
+                _discard_unfinished_games(conn, job["job_id"])
+                conn.execute("UPDATE jobs SET status = 'pending' WHERE job_id = ?", (job["job_id"],))
+                requeued += 1
+    return requeued
+
+
+def _discard_unfinished_games(conn, job_id):
+    """Deletes the job's games that never got a winner (their turns were never counted in the player statistics)."""
+    for game in conn.execute("SELECT game_id FROM games WHERE job_id = ? AND winner IS NULL", (job_id,)).fetchall():
+        game_id = game["game_id"]
+        for table in ("moves", "move_metrics", "boards", "games"):
+            conn.execute(f"DELETE FROM {table} WHERE game_id = ?", (game_id,))
+
+
+def job_counts(conn, tournament, round_number=None):
+    """Returns {status: count} for the tournament (or one of its rounds)."""
+    query = "SELECT status, COUNT(*) AS n FROM jobs WHERE tournament = ?"
+    args = [tournament]
+    if round_number is not None:
+        query += " AND round = ?"
+        args.append(round_number)
+    return {row["status"]: row["n"] for row in conn.execute(query + " GROUP BY status", args)}
+
+
+def standings(conn, tournament, player_names):
+    """Returns [(name, wins, games)] over the tournament's finished jobs, best first."""
+    table = {name: [0, 0] for name in player_names}
+    for row in conn.execute(
+        "SELECT g.player1_name, g.player2_name, g.winner FROM jobs j JOIN games g ON g.game_id = j.game_id "
+        "WHERE j.tournament = ? AND j.status = 'done'",
+        (tournament,)
+    ):
+        for name in (row["player1_name"], row["player2_name"]):
+            if name in table:
+                table[name][1] += 1
+        if row["winner"] in table:
+            table[row["winner"]][0] += 1
+    return sorted(((name, wins, games) for name, (wins, games) in table.items()), key=lambda entry: (-entry[1], entry[0]))
+
+
+# --- Workers ---
+
+def _worker_main(db_file, tournament, player_configs, worker_name, threads, console_mode, log_file):
+    """Worker process: plays claimed jobs on `threads` game threads until the queue is empty."""
+    # Imported here so the parent process never loads the provider SDKs on behalf of its workers.
+    from . import llm, scheduler
+    config.DB_FILE = db_file
+    # Spawned workers start from the module defaults, so the parent's output settings are passed on.
+    # Each worker logs to its own file; the parent draws the progress bar.
+    config.CONSOLE_MODE = "quiet" if console_mode == "progress" else console_mode
+    logs.setup_logging(log_file)
+    llm.initialize_models(player_configs)
+    configs_by_name = {player_config["name"]: player_config for player_config in player_configs}
+
+    def drain(thread_index):
+        conn = _connect(db_file)
+        try:
+            while True:
+                job = claim_job(conn, tournament, f"{worker_name}/{thread_index}")
+                if job is None:
+                    return
+                try:
+                    game_id, winner, turns = scheduler.play_game(
+                        configs_by_name[job["player1_name"]],
+                        configs_by_name[job["player2_name"]],
+                        seed=job["seed"],
+                        job_id=job["job_id"],
+                    )
+                except Exception as e:
+                    logger.exception(f"Job {job['job_id']} failed: {e}")
+                    database.flush()
+                    fail_job(conn, job["job_id"], e)
+                    continue
+                # Outside the try: the game is finished, so it must never be discarded and replayed.
+                # If this write fails, the job stays 'running' and recover_jobs marks it done.
+                finish_job(conn, job["job_id"], game_id)
+        finally:
+            conn.close()
+
+    try:
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="game") as executor:
+            list(executor.map(drain, range(threads)))
+    finally:
+        database.close()
+        logs.shutdown_logging()
+
+
+def _drain_queue(db_file, tournament, player_configs, workers, threads):
+    """Runs worker processes until no job is pending, restarting them (a few times) after a crash."""
+    context = multiprocessing.get_context("spawn")
+    for _ in range(config.TOURNAMENT_MAX_ATTEMPTS):
+        conn = _connect(db_file)
+        try:
+            counts = job_counts(conn, tournament)
+            if not counts.get("pending", 0):
+                return
+            processes = [
+                context.Process(
+                    target=_worker_main,
+                    args=(
+                        db_file, tournament, player_configs, f"worker-{i}", threads,
+                        config.CONSOLE_MODE, logs.worker_log_file(f"worker-{i}"),
+                    ),
+                    name=f"tournament-worker-{i}",
+                )
+                for i in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            progress = logs.Progress(sum(n for status, n in counts.items() if status != "bye"), unit="jobs")
+            for process in processes:
+                while process.is_alive():
+                    process.join(1.0)
+                    if progress.enabled:
+                        progress.update(job_counts(conn, tournament).get("done", 0))
+            progress.close()
+            requeued = recover_jobs(conn, tournament)
+        finally:
+            conn.close()
+        if requeued:
+            logger.warning(f"Requeued {requeued} jobs left unfinished by a crashed worker.")
+            print(f"Requeued {requeued} jobs left unfinished by a crashed worker.")
+
+
+def run(tournament, player_configs, tournament_format="round_robin", games_per_pairing=None,
+        rounds=None, workers=None, threads=None):
+    """
+    Plays a tournament between all `player_configs` and returns its standings. Running it again
+    with the same name resumes it: finished jobs are kept and only the rest are played.
+    Swiss tournaments enqueue each round once the previous one is complete.
+    """
+    if tournament_format not in FORMATS:
+        raise ValueError(f"Unknown tournament format '{tournament_format}'. Expected one of {FORMATS}.")
+    names = [player_config["name"] for player_config in player_configs]
+    if len(set(names)) != len(names) or len(names) < 2:
+        raise ValueError("A tournament needs at least two players with distinct names.")
+    games_per_pairing = config.GAMES_PER_PAIRING if games_per_pairing is None else games_per_pairing
+    workers = config.TOURNAMENT_WORKERS if workers is None else workers
+    threads = config.MAX_CONCURRENT_GAMES if threads is None else threads
+    db_file = config.DB_FILE
+    database.init_db()
+
+    conn = _connect(db_file)
+    try:
+        recover_jobs(conn, tournament)
+        if tournament_format == "round_robin":
+            enqueue_round(conn, tournament, 0, round_robin_pairings(names, games_per_pairing))
+            _drain_queue(db_file, tournament, player_configs, workers, threads)
+        else:
+            rounds = rounds or math.ceil(math.log2(len(names)))
+            for round_number in range(rounds):
+                if not job_counts(conn, tournament, round_number):
+                    played = {
+                        frozenset((row["player1_name"], row["player2_name"]))
+                        for row in conn.execute(
+                            "SELECT player1_name, player2_name FROM jobs WHERE tournament = ? AND status != 'bye'", (tournament,)
+                        )
+                    }
+                    had_bye = {
+                        row["player1_name"]
+                        for row in conn.execute("SELECT player1_name FROM jobs WHERE tournament = ? AND status = 'bye'", (tournament,))
+                    }
+                    table = [(name, wins) for name, wins, _ in standings(conn, tournament, names)]
+                    pairings, bye = swiss_pairings(table, played, games_per_pairing, had_bye)
+                    enqueue_round(conn, tournament, round_number, pairings, bye)
+                _drain_queue(db_file, tournament, player_configs, workers, threads)
+        failed = job_counts(conn, tournament).get("failed", 0)
+        if failed:
+            logger.error(f"{failed} jobs of tournament '{tournament}' failed after {config.TOURNAMENT_MAX_ATTEMPTS} attempts.")
+        return standings(conn, tournament, names)
+    finally:
+        conn.close()
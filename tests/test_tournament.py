@@ -0,0 +1,26 @@
+from src import config, logs, tournament
+
+
+def _bots(names):
+    return [{"name": name, "provider": "bot", "strategy": "random"} for name in names]
+
+
+def test_swiss_bye_rotates():
+    names = ["A", "B", "C", "D", "X"]
+    had_bye = set()
+    for _ in range(5):
+        _, bye = tournament.swiss_pairings([(name, 0) for name in names], set(), 1, had_bye)
+        assert bye not in had_bye
+        had_bye.add(bye)
+    assert had_bye == set(names)
+
+
+def test_odd_swiss_plays_everyone(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "DB_FILE", str(tmp_path / "tournament.db"))
+    monkeypatch.setattr(config, "LOG_FILE", str(tmp_path / "tournament.log"))
+    monkeypatch.setattr(config, "CONSOLE_MODE", "quiet")
+    rounds = 3
+    table = tournament.run("odd-swiss", _bots(["A", "B", "C", "D", "X"]), tournament_format="swiss",
+                           games_per_pairing=1, rounds=rounds, workers=1, threads=2)
+    logs.shutdown_logging()
+    assert all(games >= rounds - 1 for _, _, games in table), table
@@ -0,0 +1,34 @@
+import argparse
+from src import config, logs, tournament
+
+def main():
+    """Runs (or resumes) a multi-player tournament between the players in TOURNAMENT_PLAYERS."""
+    parser = argparse.ArgumentParser(description="Round-robin or Swiss tournament between all configured players.")
+    parser.add_argument("name", help="Tournament name. Running an existing name again resumes it.")
+    parser.add_argument("--format", choices=tournament.FORMATS, default=config.TOURNAMENT_FORMAT)
+    parser.add_argument("--games-per-pairing", type=int, default=config.GAMES_PER_PAIRING)
+    parser.add_argument("--rounds", type=int, default=config.TOURNAMENT_ROUNDS, help="Swiss rounds.")
+    parser.add_argument("--workers", type=int, default=config.TOURNAMENT_WORKERS, help="Worker processes.")
+    parser.add_argument("--threads", type=int, default=config.MAX_CONCURRENT_GAMES, help="Concurrent games per worker.")
+    parser.add_argument("--console", choices=("verbose", "progress", "quiet"), default=config.CONSOLE_MODE,
+                        help="Console output: every turn, a progress bar, or only the standings.")
+    args = parser.parse_args()
+    config.CONSOLE_MODE = args.console
+    logs.setup_logging()
+
+    table = tournament.run(
+        args.name,
+        config.TOURNAMENT_PLAYERS,
+        tournament_format=args.format,
+        games_per_pairing=args.games_per_pairing,
+        rounds=args.rounds,
+        workers=args.workers,
+        threads=args.threads,
+    )
+    print(f"\n--- Tournament '{args.name}' standings ---")
+    for rank, (name, wins, games) in enumerate(table, start=1):
+        print(f"{rank}. {name}: {wins} wins in {games} games")
+    logs.shutdown_logging()
+
+if __name__ == "__main__":
+    main()